@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from schema import as_plain
+
+
+# -------------------------------
+# AGGREGATE CUBE
+# -------------------------------
+# Quantity summed over customers per product and day, with the day's weather
+# season, festival and month alongside. Built once per data load; every chart
+# is then a slice of it instead of a scan over the raw rows. Day rather than
+# month granularity keeps the sidebar date range exact.
+class AggregateCube:
+    def __init__(self, seasonal_df):
+        day = seasonal_df["Date"].dt.normalize()
+        cube = seasonal_df.groupby(["Product", day, "Weather_Season", "Festival_Season"], observed=True)["Quantity"].sum()
+        self.frame = cube.reset_index()
+        self.frame["Month"] = self.frame["Date"].dt.to_period("M").dt.to_timestamp()
+        # sorted by product, then date: each product is one contiguous block
+        sizes = self.frame.groupby("Product", observed=True, sort=False).size()
+        stops = sizes.cumsum()
+        self._bounds = dict(zip(sizes.index, zip(stops - sizes, stops)))
+
+    def product(self, product, start=None, end=None):
+        first, stop = self._bounds.get(product, (0, 0))
+        rows = self.frame.iloc[first:stop]
+        dates = rows["Date"].to_numpy()
+        lo = 0 if start is None else dates.searchsorted(np.datetime64(pd.Timestamp(start)), side="left")
+        hi = len(rows) if end is None else dates.searchsorted(np.datetime64(pd.Timestamp(end)), side="right")
+        return rows.iloc[lo:hi]
+
+    def product_totals(self):
+        return totals(self.frame, "Product")
+
+    def monthly(self, product):
+        return totals(self.product(product), "Month")
+
+
+def totals(rows, by):
+    return as_plain(rows.groupby(by, observed=True)["Quantity"].sum().reset_index())
+
+
+def purchase_counts(rows):
+    return as_plain(rows.groupby("Product", observed=True)["Date"].count().reset_index(name="Purchase Count"))
+
+
+def monthly_heatmap(rows):
+    month = rows["Date"].dt.to_period("M").dt.to_timestamp().rename("Month")
+    return rows.pivot_table(index="Product", columns=month, values="Quantity", aggfunc="sum", fill_value=0,
+                            observed=True)
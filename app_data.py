@@ -0,0 +1,166 @@
+import collections
+import os
+
+import streamlit as st
+
+from baselines import METHODS, baseline_forecast
+from batch_forecast import MIN_POINTS
+from data_loader import IncrementalLoader
+from db import database
+from diagnostics import substage, tracks_misses
+from forecast_cli import read_results
+from forecast_jobs import ForecastJobs
+from forecast_store import ForecastStore
+from pushdown import AGGREGATE_MODE, SqlAggregates, supports
+from schema import as_plain
+from shared_data import SharedData
+from snapshot import SnapshotRefresher, snapshot_path
+from streaming import StreamRefresher
+
+# snapshot: the table loaded whole into a shared, memory-mapped frame.
+# streamed: aggregates streamed from the table in chunks and per-customer
+# queries, so no process holds the raw rows.
+DATA_MODE = os.environ.get("DATA_MODE", "snapshot")
+
+# What an app reads: the database (its URL from $<DATABASE>_DATABASE_URL or
+# [connections.<database>] in .streamlit/secrets.toml), the table, the
+# season boundaries its rows are tagged with, and whether rows without a
+# Date are dropped.
+Source = collections.namedtuple("Source", ["database", "table", "seasons", "dated_only"], defaults=(None, False))
+
+
+# -------------------------------
+# SHARED RESOURCES
+# -------------------------------
+# Everything below is cached per source and shared by every session of the
+# app; the data-derived entries are keyed on the data version as well.
+# Pooled engine, one per process.
+def connect_to_db(source):
+    return database(source.database)
+
+
+@st.cache_resource
+@tracks_misses
+def snapshot(source):
+    return SnapshotRefresher(IncrementalLoader(connect_to_db(source), source.table), snapshot_path(source.table))
+
+
+@st.cache_resource
+@tracks_misses
+def stream_refresher(source):
+    return StreamRefresher(connect_to_db(source), source.table, seasons=source.seasons, dated_only=source.dated_only)
+
+
+# Whichever of the two keeps this mode's data current; both have version
+# and refresh(full).
+def refresher(source):
+    return stream_refresher(source) if DATA_MODE == "streamed" else snapshot(source)
+
+
+# one read-only (season-tagged when the source has seasons) copy of the table
+@st.cache_resource(max_entries=1)
+@tracks_misses
+def shared_data(source, version):
+    frame = snapshot(source).frame
+    if source.dated_only:
+        frame = frame.dropna(subset=["Date"])
+    return SharedData(frame, source.table, seasons=source.seasons, stage=substage)
+
+
+# SharedData or StreamedData for the version; the apps only use what both have.
+def dashboard_data(source, version):
+    return stream_refresher(source).data if DATA_MODE == "streamed" else shared_data(source, version)
+
+
+# SharedData builds its cube on first use, so a miss here is the build;
+# StreamedData brings its cube along from the streamed pass.
+@st.cache_resource(max_entries=1)
+@tracks_misses
+def aggregate_cube(source, version):
+    return dashboard_data(source, version).cube
+
+
+@st.cache_resource
+def sql_aggregates(source):
+    return SqlAggregates(connect_to_db(source), source.table, dated_only=source.dated_only)
+
+
+# GROUP BYs run in the database with AGGREGATE_MODE=sql, on the shared frame otherwise
+@st.cache_data(max_entries=64)
+@tracks_misses
+def cached_aggregate(source, version, name, *args):
+    use_sql = AGGREGATE_MODE == "sql" and supports(connect_to_db(source))
+    return getattr(sql_aggregates(source) if use_sql else dashboard_data(source, version), name)(*args)
+
+
+# each aggregate a stage of its own, named after it
+def aggregate(source, version, name, *args):
+    with substage(name, cached=True) as stage:
+        result = cached_aggregate(source, version, name, *args)
+        stage["rows"] = len(result)
+    return result
+
+
+@st.cache_data(max_entries=32)
+@tracks_misses
+def customer_summary(source, version, customer):
+    return (aggregate(source, version, "customer_frequency", customer),
+            aggregate(source, version, "customer_intervals", customer),
+            aggregate(source, version, "customer_heatmap", customer))
+
+
+@st.cache_data(max_entries=len(METHODS))
+@tracks_misses
+def cached_fast_forecasts(source, version, method):
+    return as_plain(baseline_forecast(dashboard_data(source, version).sales, method=method))
+
+
+def fast_forecasts(source, version, method):
+    with substage("fast_forecasts", cached=True) as stage:
+        forecasts = cached_fast_forecasts(source, version, method)
+        stage["rows"] = len(forecasts)
+    return forecasts
+
+
+@st.cache_data(ttl=600)
+@tracks_misses
+def precomputed_results(source):
+    return read_results(connect_to_db(source), source.table)
+
+
+@st.cache_resource
+def forecast_store():
+    store = ForecastStore()
+    store.evict()
+    return store
+
+
+@st.cache_resource
+def forecast_jobs(min_points=MIN_POINTS):
+    return ForecastJobs(store=forecast_store(), min_points=min_points)
+
+
+# -------------------------------
+# LOAD DATA
+# -------------------------------
+# The data version this run reads and the data for it; stops the script
+# when the table could not be read or is empty. The refresher's load from
+# the database (in streamed mode the whole streamed pass, season tagging
+# included) and the shared frame built from it are stages of their own.
+def load(source, diag):
+    if st.sidebar.button("Reload all data"):
+        with diag.stage("reload"):
+            refresher(source).refresh(full=True)
+    try:
+        with diag.stage("refresher_load", cached=True):
+            version = refresher(source).version
+        with diag.stage("shared_data", cached=True) as stage:
+            data = dashboard_data(source, version)
+            stage["rows"] = data.rows
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        st.stop()
+    if not data.rows:
+        st.error("No data found.")
+        st.stop()
+    return version, data
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from batch_forecast import COLUMNS, monthly_matrix
+
+SEASON = 12
+ALPHA = 0.3
+ALPHAS = np.linspace(0.05, 0.95, 19)
+METHODS = ["Exp Smoothing", "Seasonal Naive", "Mean"]
+
+
+# -------------------------------
+# SERIES MATRIX
+# -------------------------------
+# Monthly series of different lengths, right-aligned into one float matrix:
+# the last month of every series sits in the last column and the months
+# before a series started are NaN. Every baseline below is then one array
+# expression over all series at once.
+def right_aligned(series):
+    values = [ts.to_numpy(dtype="float64") for ts in series.values()]
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    matrix = np.full((len(values), lengths.max(initial=0)), np.nan)
+    if len(values):
+        rows = np.repeat(np.arange(len(values)), lengths)
+        starts = np.cumsum(lengths) - lengths
+        matrix[rows, matrix.shape[1] - lengths[rows] + np.arange(lengths.sum()) - starts[rows]] = np.concatenate(values)
+    return matrix
+
+
+def points(matrix):
+    return (~np.isnan(matrix)).sum(axis=1)
+
+
+# -------------------------------
+# BASELINE FORECASTS (next month)
+# -------------------------------
+def mean_forecast(matrix):
+    return np.nansum(matrix, axis=1) / np.maximum(points(matrix), 1)
+
+
+# Same month last year; NaN where the series is shorter than a season.
+def seasonal_naive(matrix, season=SEASON):
+    if matrix.shape[1] < season:
+        return np.full(len(matrix), np.nan)
+    return matrix[:, -season]
+
+
+# Simple exponential smoothing with the level started at the first value:
+# level_n = (1-a)^(n-1) x_1 + sum a (1-a)^(n-j) x_j, i.e. one weighted row sum
+# with geometric weights plus a correction for the first value. alpha is one
+# value for all series or one per row.
+def exp_smoothing(matrix, alpha=ALPHA):
+    alpha = np.broadcast_to(np.asarray(alpha, dtype="float64"), (len(matrix),))
+    n = points(matrix)
+    distance = np.arange(matrix.shape[1])[::-1]
+    level = (np.nan_to_num(matrix) * (alpha[:, None] * (1 - alpha[:, None]) ** distance)).sum(axis=1)
+    first = matrix[np.arange(len(matrix)), matrix.shape[1] - np.maximum(n, 1)] if matrix.size else np.zeros(0)
+    return level + np.nan_to_num(first) * (1 - alpha) ** n
+
+
+# Smoothing constant per series with the smallest sum of squared one-step
+# errors, every candidate in ALPHAS run side by side: one pass over the
+# months, each step a (series x alphas) array operation.
+def fit_alpha(matrix, alphas=ALPHAS):
+    level = np.full((len(matrix), len(alphas)), np.nan)
+    sse = np.zeros((len(matrix), len(alphas)))
+    for month in matrix.T:
+        x = month[:, None]
+        error = np.nan_to_num(x - level)
+        sse += error ** 2
+        level = np.where(np.isnan(level), x, level + alphas * error)
+    return alphas[sse.argmin(axis=1)]
+
+
+# -------------------------------
+# SERIES SCORES
+# -------------------------------
+# Length, share of zero months and lag-12 autocorrelation as a measure of
+# seasonality strength (0 when there is not a full season of pairs).
+def series_scores(matrix, season=SEASON):
+    n = points(matrix)
+    sparsity = (matrix == 0).sum(axis=1) / np.maximum(n, 1)
+    centered = np.nan_to_num(matrix - mean_forecast(matrix)[:, None])
+    seasonality = np.zeros(len(matrix))
+    if matrix.shape[1] > season:
+        lagged = (centered[:, season:] * centered[:, :-season]).sum(axis=1)
+        spread = (centered ** 2).sum(axis=1)
+        np.divide(lagged, spread, out=seasonality, where=spread > 0)
+    return pd.DataFrame({"Points": n, "Sparsity": sparsity, "Seasonality": seasonality})
+
+
+# -------------------------------
+# FAST FORECAST (every pair)
+# -------------------------------
+# Same columns as the Tab 4 SARIMA output, for all customers at once.
+# Seasonal naive falls back to the mean for series shorter than a season.
+def baseline_forecast(df, customers=None, method="Exp Smoothing"):
+    pairs, matrix = monthly_matrix(df, customers)
+    frame = pairs.copy()
+    if method == "Exp Smoothing":
+        frame["Forecast"] = exp_smoothing(matrix, fit_alpha(matrix))
+        frame["Method"] = method
+    elif method == "Seasonal Naive":
+        naive = seasonal_naive(matrix)
+        frame["Forecast"] = np.where(np.isnan(naive), mean_forecast(matrix), naive)
+        frame["Method"] = np.where(np.isnan(naive), "Mean", method)
+    elif method == "Mean":
+        frame["Forecast"] = mean_forecast(matrix)
+        frame["Method"] = method
+    else:
+        raise ValueError(f"unknown baseline method: {method}")
+    frame["Points"] = points(matrix)
+    return frame[COLUMNS]
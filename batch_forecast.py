@@ -0,0 +1,279 @@
+import io
+import multiprocessing
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from forecast_store import FULL_REFIT_AGE, series_id, series_key
+from next_purchase import KEYS, pair_groups
+
+ORDER = (1, 1, 1)
+SEASONAL_ORDER = (1, 1, 0, 12)
+MIN_POINTS = 4
+COLUMNS = KEYS + ["Forecast", "Method", "Points"]
+DEFAULT_WORKERS = int(os.environ.get("FORECAST_WORKERS", "0")) or None
+DRIFT_LIMIT = 3.0
+
+
+def sarima_forecast(ts, order=ORDER, seasonal_order=SEASONAL_ORDER):
+    model = SARIMAX(ts, order=order, seasonal_order=seasonal_order)
+    result = model.fit(disp=False)
+    return result.forecast(steps=1).iloc[0]
+
+
+# -------------------------------
+# MONTHLY SERIES
+# -------------------------------
+# Same values as prod_df.resample("M", on="Date")["Quantity"].sum() for every
+# (customer, product) pair - month-end index, zero-filled gaps - but built
+# from one scatter-add over all rows instead of one resample per pair. The
+# values of all pairs are laid out back to back; pair g covers months
+# lo[g]..hi[g] (months since year 0) starting at offset[g].
+def monthly_values(df, customers=None):
+    data = df.loc[df["Date"].notna() & df["Customer ID"].notna() & df["Product"].notna(), KEYS + ["Date", "Quantity"]]
+    if customers is not None:
+        data = data[data["Customer ID"].isin(customers)]
+    if data.empty:
+        return None
+
+    group, first_row = pair_groups(data)
+    n_groups = len(first_row)
+    months = (data["Date"].dt.year * 12 + data["Date"].dt.month - 1).to_numpy()
+    quantity = data["Quantity"].fillna(0).to_numpy()
+
+    lo = np.full(n_groups, months.max())
+    hi = np.full(n_groups, months.min())
+    np.minimum.at(lo, group, months)
+    np.maximum.at(hi, group, months)
+    span = hi - lo + 1
+    offset = np.r_[0, np.cumsum(span)[:-1]]
+    values = np.zeros(span.sum(), dtype=np.result_type(quantity.dtype, np.int64))
+    np.add.at(values, offset[group] + months - lo[group], quantity)
+    return data[KEYS].iloc[first_row].reset_index(drop=True), lo, span, offset, values
+
+
+def month_ends(first_month, periods):
+    start = pd.Timestamp(year=first_month // 12, month=first_month % 12 + 1, day=1)
+    return pd.date_range(start, periods=periods, freq="M", name="Date")
+
+
+def monthly_series(df, customers=None):
+    parts = monthly_values(df, customers)
+    if parts is None:
+        return {}
+    return series_from_values(*parts)
+
+
+# One Series per row of keys, out of values laid out as monthly_values does.
+def series_from_values(keys, lo, span, offset, values):
+    if not len(keys):
+        return {}
+    first_month = lo.min()
+    index = month_ends(first_month, (lo + span).max() - first_month)
+    return {
+        key: pd.Series(values[offset[g]:offset[g] + span[g]],
+                       index=index[lo[g] - first_month:lo[g] - first_month + span[g]], name="Quantity")
+        for g, key in enumerate(keys.itertuples(index=False, name=None))
+    }
+
+
+# The same values as one dense float matrix, one row per pair, right-aligned:
+# each pair's last month sits in the last column and the months before its
+# first purchase are NaN. No per-pair Series are built.
+def monthly_matrix(df, customers=None):
+    parts = monthly_values(df, customers)
+    if parts is None:
+        return pd.DataFrame(columns=KEYS), np.zeros((0, 0))
+    pairs, lo, span, offset, values = parts
+    matrix = np.full((len(pairs), span.max()), np.nan)
+    rows = np.repeat(np.arange(len(pairs)), span)
+    matrix[rows, span.max() - span[rows] + np.arange(len(values)) - offset[rows]] = values
+    return pairs, matrix
+
+
+# -------------------------------
+# BATCH FORECAST
+# -------------------------------
+def forecast_series(ts, min_points=MIN_POINTS):
+    if len(ts.dropna()) >= min_points:
+        try:
+            return sarima_forecast(ts), "SARIMA"
+        except Exception:
+            return ts.mean(), "Avg"
+    return ts.mean(), "Est Avg"
+
+
+# -------------------------------
+# INCREMENTAL (WARM-STARTED) FITS
+# -------------------------------
+# A state holds the fitted parameters, the series they were fitted on (first
+# month, length, hash of the values) and when the last fit from default start
+# parameters happened. Months added at the end are run through the Kalman
+# filter with the stored parameters. If earlier months changed, the model is
+# refit starting from the stored parameters; if any of the new months'
+# standardized one-step errors is beyond DRIFT_LIMIT the stored parameters no
+# longer describe the series and it is fitted from scratch. Without a usable
+# state, or once the last full fit is older than FULL_REFIT_AGE, it is fitted
+# from scratch as well.
+def usable_state(state, ts, model, now):
+    return (
+        state is not None
+        and state["start"] == ts.index[0].isoformat()
+        and state["n_obs"] <= len(ts)
+        and len(state["params"]) == model.k_params
+        and now - state["full_fit"] < FULL_REFIT_AGE
+    )
+
+
+def drifted(result, new_points):
+    if new_points == 0:
+        return False
+    errors = result.filter_results.standardized_forecasts_error[0, -new_points:]
+    return not np.all(np.abs(errors) < DRIFT_LIMIT)
+
+
+def incremental_forecast(ts, state=None, min_points=MIN_POINTS, now=None):
+    if len(ts.dropna()) < min_points:
+        return (*forecast_series(ts, min_points), None, None)
+    now = time.time() if now is None else now
+    model = SARIMAX(ts, order=ORDER, seasonal_order=SEASONAL_ORDER)
+    try:
+        if not usable_state(state, ts, model, now):
+            result, fit, full_fit = model.fit(disp=False), "full", now
+        else:
+            params, full_fit = np.asarray(state["params"]), state["full_fit"]
+            history = ts.iloc[:state["n_obs"]]
+            if series_key(history) != state["history"]:
+                result, fit = model.fit(start_params=params, disp=False), "warm"
+            else:
+                result, fit = model.filter(params), "filter"
+                if drifted(result, len(ts) - state["n_obs"]):
+                    result, fit, full_fit = model.fit(disp=False), "full", now
+        value = result.forecast(steps=1).iloc[0]
+    except Exception:
+        return ts.mean(), "Avg", None, None
+    state = {
+        "params": np.asarray(result.params).tolist(), "start": ts.index[0].isoformat(),
+        "n_obs": len(ts), "history": series_key(ts), "full_fit": full_fit,
+    }
+    return value, "SARIMA", fit, state
+
+
+# -------------------------------
+# WORKER PROCESSES
+# -------------------------------
+# Workers come from the forkserver: a single-threaded process started once,
+# so no worker is forked from the Streamlit server with locks held by its
+# Tornado, refresher or script threads. Spawn and forkserver normally also
+# re-run __main__ in every worker - under Streamlit that is the page script,
+# which would execute the whole page. Workers only ever call functions from
+# importable modules, so they are started without __main__.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    from multiprocessing import forkserver, popen_forkserver, spawn, util
+    from multiprocessing.context import ForkServerContext, ForkServerProcess, reduction, set_spawning_popen
+
+    # popen_forkserver.Popen._launch, minus the __main__ entries
+    class _WorkerPopen(popen_forkserver.Popen):
+        def _launch(self, process_obj):
+            prep_data = spawn.get_preparation_data(process_obj._name)
+            prep_data.pop("init_main_from_path", None)
+            prep_data.pop("init_main_from_name", None)
+            buf = io.BytesIO()
+            set_spawning_popen(self)
+            try:
+                reduction.dump(prep_data, buf)
+                reduction.dump(process_obj, buf)
+            finally:
+                set_spawning_popen(None)
+            self.sentinel, w = forkserver.connect_to_new_process(self._fds)
+            parent_w = os.dup(w)
+            self.finalizer = util.Finalize(self, util.close_fds, (parent_w, self.sentinel))
+            with open(w, "wb", closefd=True) as f:
+                f.write(buf.getbuffer())
+            self.pid = forkserver.read_signed(self.sentinel)
+
+    class _WorkerProcess(ForkServerProcess):
+        @staticmethod
+        def _Popen(process_obj):
+            return _WorkerPopen(process_obj)
+
+    class _WorkerContext(ForkServerContext):
+        Process = _WorkerProcess
+
+    WORKER_CONTEXT = _WorkerContext()
+    # imported once in the forkserver instead of once per worker
+    WORKER_CONTEXT.set_forkserver_preload(["batch_forecast"])
+else:
+    WORKER_CONTEXT = multiprocessing.get_context()
+
+
+# Workers start fresh, without the caller's warning filters; SARIMAX warns
+# about start parameters and convergence on every other series.
+def _quiet_worker():
+    warnings.filterwarnings("ignore")
+
+
+def process_pool(max_workers=DEFAULT_WORKERS):
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=WORKER_CONTEXT, initializer=_quiet_worker)
+
+
+# With states, each series is fitted with incremental_forecast and the result
+# carries the fit kind and the new state along with the forecast.
+def forecast_many(series, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, states=None):
+    if states is None:
+        fit, args = partial(forecast_series, min_points=min_points), (series,)
+    else:
+        fit, args = partial(incremental_forecast, min_points=min_points), (series, states)
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(series) < 2:
+        return list(map(fit, *args))
+    with process_pool(workers) as pool:
+        return list(pool.map(fit, *args, chunksize=max(1, len(series) // (workers * 4))))
+
+
+# With a ForecastStore only series whose content changed since they were last
+# fitted go to the pool; everything else is read back from disk. Incremental
+# runs also start those fits from the pair's stored model state and report
+# the fit kind per series: cached, filter, warm, full, or None for non-SARIMA
+# forecasts.
+def stored_forecasts(series, store=None, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, incremental=False):
+    pairs, values = list(series), list(series.values())
+    if store is None:
+        return forecast_many(values, max_workers=max_workers, min_points=min_points), None
+    keys = [series_key(ts, ORDER, SEASONAL_ORDER, min_points) for ts in values]
+    cached = store.get_many(keys)
+    todo = [i for i, key in enumerate(keys) if key not in cached]
+    fits = None
+    if incremental:
+        ids = [series_id(pairs[i], ORDER, SEASONAL_ORDER, min_points) for i in todo]
+        states = store.get_models(ids)
+        fitted = forecast_many([values[i] for i in todo], max_workers=max_workers, min_points=min_points,
+                               states=[states.get(name) for name in ids])
+        store.put_models({name: state for name, (*_, state) in zip(ids, fitted) if state is not None})
+        fits = dict(zip(todo, (fit for _, _, fit, _ in fitted)))
+        fits = [fits.get(i, "cached") for i in range(len(keys))]
+        fitted = [(value, method) for value, method, _, _ in fitted]
+    else:
+        fitted = forecast_many([values[i] for i in todo], max_workers=max_workers, min_points=min_points)
+    fresh = {keys[i]: result for i, result in zip(todo, fitted)}
+    store.put_many(fresh)
+    return [cached.get(key) or fresh[key] for key in keys], fits
+
+
+def batch_forecast(df, customers=None, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, store=None,
+                   incremental=False):
+    series = monthly_series(df, customers)
+    results, fits = stored_forecasts(series, store, max_workers, min_points, incremental)
+    frame = pd.DataFrame(
+        [(cust_id, prod, value, method, len(ts)) for ((cust_id, prod), ts), (value, method) in zip(series.items(), results)],
+        columns=COLUMNS,
+    )
+    if fits is not None:
+        frame["Fit"] = fits
+    return frame
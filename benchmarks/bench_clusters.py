@@ -0,0 +1,84 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch_forecast import forecast_many, monthly_series
+from clustering import forecast_clusters
+from next_purchase import KEYS
+from synthetic import synthetic_sales
+
+
+# -------------------------------
+# HOLD-OUT SPLIT
+# -------------------------------
+# Everything before the last month is history; the last month's quantity per
+# pair is what the forecasts are scored against. Only pairs whose history
+# runs up to the month before are scored - for the others the next month of
+# their series is not the held-out month.
+def hold_out(df):
+    last = df["Date"].max().to_period("M").to_timestamp()
+    history = df[df["Date"] < last]
+    actual = df[df["Date"] >= last].groupby(KEYS, observed=True)["Quantity"].sum()
+    series = monthly_series(history)
+    end = max(ts.index[-1] for ts in series.values())
+    scored = {pair: ts for pair, ts in series.items() if ts.index[-1] == end}
+    return series, actual.reindex(pd.MultiIndex.from_tuples(list(scored), names=KEYS), fill_value=0)
+
+
+def mae(forecasts, actual):
+    return float(np.nanmean(np.abs(forecasts.reindex(actual.index).to_numpy() - actual.to_numpy())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clustered SARIMA: accuracy and time against the number of clusters")
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--seasonality", type=float, default=0.5)
+    parser.add_argument("--sparsity", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--clusters", type=int, nargs="+", default=[1, 5, 10, 25, 50, 100])
+    parser.add_argument("--workers", type=int, default=None, help="fitting processes (default: all cores)")
+    parser.add_argument("--no-reference", action="store_true", help="skip fitting every series on its own")
+    parser.add_argument("--output", default="bench_clusters.json")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    sales = synthetic_sales(args.rows, args.customers, args.products, seed=args.seed,
+                            seasonality=args.seasonality, sparsity=args.sparsity)
+    series, actual = hold_out(sales)
+    print(f"{len(series):,} series, {len(actual):,} scored on the held-out month")
+
+    results = []
+    print(f"{'clusters':>10} {'seconds':>9} {'MAE':>9}")
+    for n_clusters in args.clusters:
+        start = time.perf_counter()
+        frame = forecast_clusters(series, n_clusters, max_workers=args.workers)
+        seconds = time.perf_counter() - start
+        error = mae(frame.set_index(KEYS)["Forecast"], actual)
+        results.append({"clusters": n_clusters, "seconds": round(seconds, 3), "mae": round(error, 4)})
+        print(f"{n_clusters:>10} {seconds:>9.2f} {error:>9.3f}")
+
+    if not args.no_reference:
+        start = time.perf_counter()
+        fitted = forecast_many(list(series.values()), max_workers=args.workers)
+        seconds = time.perf_counter() - start
+        forecasts = pd.Series([value for value, _ in fitted], index=pd.MultiIndex.from_tuples(list(series), names=KEYS))
+        error = mae(forecasts, actual)
+        results.append({"clusters": None, "seconds": round(seconds, 3), "mae": round(error, 4)})
+        print(f"{'per series':>10} {seconds:>9.2f} {error:>9.3f}")
+
+    with open(args.output, "w") as f:
+        json.dump({"args": vars(args), "results": results}, f, indent=2)
+    print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from next_purchase import predict_next_purchase
+from synthetic import synthetic_sales
+
+
+# -------------------------------
+# CURRENT DASHBOARD LOOP (reference)
+# -------------------------------
+def loop_next_purchase(df):
+    next_purchase_records = []
+    for cust_id in df["Customer ID"].unique():
+        cust_df = df[df["Customer ID"] == cust_id]
+        for prod in cust_df["Product"].unique():
+            prod_df = cust_df[cust_df["Product"] == prod]
+            purchase_dates = prod_df["Date"].sort_values()
+            if len(purchase_dates) > 1:
+                gaps = purchase_dates.diff().dropna().dt.days
+                avg_gap = gaps.mean()
+                next_date = purchase_dates.max() + pd.Timedelta(days=avg_gap)
+                next_date = next_date.date()
+            else:
+                next_date = "Not enough data"
+            next_purchase_records.append({
+                "Customer ID": cust_id,
+                "Product": prod,
+                "Next Purchase": next_date
+            })
+    return pd.DataFrame(next_purchase_records)
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Next purchase: grouped engine vs. per-pair loop")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--loop-max-rows", type=int, default=None,
+                        help="skip the loop above this many rows (it can take many minutes)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'loop (s)':>10} {'grouped (s)':>12} {'speedup':>8}  match")
+    for n_rows in args.sizes:
+        df = synthetic_sales(n_rows, args.customers, args.products)
+        fast, fast_time = timed(predict_next_purchase, df)
+        if args.loop_max_rows is not None and n_rows > args.loop_max_rows:
+            print(f"{n_rows:>10} {'skipped':>10} {fast_time:>12.3f} {'-':>8}  -")
+            continue
+        slow, slow_time = timed(loop_next_purchase, df)
+        match = fast.reset_index(drop=True).equals(slow.reset_index(drop=True))
+        print(f"{n_rows:>10} {slow_time:>10.3f} {fast_time:>12.3f} {slow_time / fast_time:>7.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    main()
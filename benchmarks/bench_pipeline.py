@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aggregates import AggregateCube
+from baselines import baseline_forecast
+from batch_forecast import forecast_many, monthly_series
+from data_loader import IncrementalLoader
+from next_purchase import predict_next_purchase
+from schema import compact_dtypes
+from seasons import tag_seasons
+from streaming import stream_table
+from synthetic import synthetic_sales
+from tiering import baseline_forecasts
+
+
+# -------------------------------
+# PIPELINE STAGES
+# -------------------------------
+# Each stage reads what earlier stages left in ctx, in the order the
+# dashboards run them.
+def load(ctx):
+    with ctx["engine"].connect() as conn:
+        return IncrementalLoader(conn, "sales").load()
+
+
+# Chunked alternative to load + the aggregate stages; peak memory is the
+# number to compare with load.
+def stream(ctx):
+    with ctx["engine"].connect() as conn:
+        streamed = stream_table(conn, "sales")
+    return streamed.cube(), streamed.monthly(), streamed.gap_stats()
+
+
+def seasonal_tags(ctx):
+    df = ctx["load"].copy(deep=False)
+    df["Weather_Season"], df["Festival_Season"] = tag_seasons(df["Date"])
+    return compact_dtypes(df)
+
+
+def sarima(ctx):
+    series = list(ctx["monthly_series"].values())[:ctx["sarima_series"]]
+    return forecast_many(series, max_workers=1)
+
+
+STAGES = {
+    "load": load,
+    "stream": stream,
+    "seasonal_tags": seasonal_tags,
+    "aggregate_cube": lambda ctx: AggregateCube(ctx["seasonal_tags"]),
+    "next_purchase": lambda ctx: predict_next_purchase(ctx["load"]),
+    "monthly_series": lambda ctx: monthly_series(ctx["load"]),
+    "model_tiers": lambda ctx: baseline_forecasts(ctx["monthly_series"]),
+    "baseline_forecast": lambda ctx: baseline_forecast(ctx["load"]),
+    "sarima": sarima,
+}
+
+
+# Wall time is the best of `repeat` plain runs; peak memory comes from one
+# more run under tracemalloc, which would otherwise slow the timed runs down.
+def measure(stage, ctx, memory=True, repeat=1):
+    seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = STAGES[stage](ctx)
+        seconds = min(seconds, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        STAGES[stage](ctx)
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def run(args):
+    results = []
+    for n_rows in args.sizes:
+        sales = synthetic_sales(n_rows, args.customers, args.products, seed=args.seed,
+                                seasonality=args.seasonality, sparsity=args.sparsity)
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'sales.sqlite')}")
+            sales.to_sql("sales", engine, index=False, chunksize=50_000)
+            ctx = {"engine": engine, "sarima_series": args.sarima_series}
+            for stage in args.stages:
+                ctx[stage], seconds, peak = measure(stage, ctx, memory=not args.no_memory, repeat=args.repeat)
+                results.append({"rows": n_rows, "stage": stage, "seconds": round(seconds, 4),
+                                "peak_mb": None if peak is None else round(peak, 2)})
+                print(f"{n_rows:>10} {stage:<18} {seconds:>9.3f}s"
+                      + ("" if peak is None else f" {peak:>9.1f} MB"))
+            engine.dispose()
+    return results
+
+
+# Stages that got slower than tolerance (relative) against an earlier run.
+def compare(results, previous, tolerance):
+    before = {(r["rows"], r["stage"]): r for r in previous["results"]}
+    regressions = []
+    print(f"\n{'rows':>10} {'stage':<18} {'before':>9} {'after':>9} {'ratio':>7}")
+    for r in results:
+        old = before.get((r["rows"], r["stage"]))
+        if old is None or not old["seconds"]:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        flag = " <-" if ratio > 1 + tolerance else ""
+        print(f"{r['rows']:>10} {r['stage']:<18} {old['seconds']:>9.3f} {r['seconds']:>9.3f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and measure every pipeline stage on synthetic sales")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--customers", type=int, default=2_000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--seasonality", type=float, default=0.3)
+    parser.add_argument("--sparsity", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=list(STAGES))
+    parser.add_argument("--sarima-series", type=int, default=20, help="series fitted in the sarima stage")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the fastest is recorded")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run of each stage")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare wall times against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown reported as a regression")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    results = run(args)
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                "machine": platform.machine(), "cpus": os.cpu_count(), "args": vars(args),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# SYNTHETIC SALES
+# -------------------------------
+# Rows shaped like the sales tables (Customer ID, Product, Date, Quantity),
+# reproducible for a given seed. seasonality scales quantities by up to
+# +/- that share over the year, with a different peak month per product.
+# sparsity is the share of (customer, product, month) cells with no sales at
+# all; enough extra rows are drawn that about n_rows remain.
+def synthetic_sales(n_rows, n_customers, n_products, seed=0, seasonality=0.0, sparsity=0.0, years=3):
+    rng = np.random.default_rng(seed)
+    drawn = int(n_rows / (1 - sparsity)) if sparsity else n_rows
+    start = np.datetime64("2022-01-01")
+    customer = rng.integers(0, n_customers, drawn)
+    product = rng.integers(0, n_products, drawn)
+    date = start + rng.integers(0, years * 365, drawn).astype("timedelta64[D]")
+    quantity = rng.integers(1, 50, drawn)
+
+    if seasonality:
+        month = date.astype("datetime64[M]").astype(np.int64) % 12
+        peak = rng.integers(0, 12, n_products)
+        scale = 1 + seasonality * np.cos(2 * np.pi * (month - peak[product]) / 12)
+        quantity = np.maximum(1, np.rint(quantity * scale)).astype(np.int64)
+    if sparsity:
+        n_months = years * 12 + 1
+        month = (date.astype("datetime64[M]") - start.astype("datetime64[M]")).astype(np.int64)
+        inactive = rng.random(n_customers * n_products * n_months) < sparsity
+        keep = ~inactive[(customer * n_products + product) * n_months + month]
+        customer, product, date, quantity = customer[keep], product[keep], date[keep], quantity[keep]
+
+    return pd.DataFrame({
+        "Customer ID": customer.astype(str),
+        "Product": np.char.add("P", product.astype(str)),
+        "Date": pd.to_datetime(date).astype("datetime64[ns]"),
+        "Quantity": quantity,
+    })
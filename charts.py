@@ -0,0 +1,67 @@
+import io
+import os
+
+import seaborn as sns
+import streamlit as st
+from matplotlib.figure import Figure
+
+from diagnostics import substage, tracks_misses
+
+CHART_CACHE_ENTRIES = int(os.environ.get("CHART_CACHE_ENTRIES", 256))
+DPI = 144
+
+
+# -------------------------------
+# RENDERING
+# -------------------------------
+# Charts are drawn on a bare Figure rather than through pyplot: nothing is
+# registered in pyplot's global figure list, so there is nothing to forget to
+# close, and concurrent sessions don't share a "current figure". The figure is
+# cleared as soon as its PNG is written so the memory goes back right away.
+def _png(fig):
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=DPI, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+
+# PNG bytes are cached keyed by the aggregate frame and the chart options, so
+# every session looking at the same slice reuses one render and a rerun with
+# unchanged data draws nothing.
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+@tracks_misses
+def bar_png(data, x, y, title=None, figsize=(10, 4), color=None, hue=None, palette=None, rotation=0):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.barplot(data=data, x=x, y=y, color=color, hue=hue, palette=palette, ax=ax)
+    if title:
+        ax.set_title(title)
+    if rotation:
+        ax.tick_params(axis="x", labelrotation=rotation)
+    return _png(fig)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ENTRIES, show_spinner=False)
+@tracks_misses
+def heatmap_png(data, figsize=(12, 8), cmap="YlGnBu"):
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+    sns.heatmap(data, cmap=cmap, linewidths=0.5, ax=ax)
+    return _png(fig)
+
+
+# -------------------------------
+# CHARTS
+# -------------------------------
+# Each chart is a stage of the running script: a hit when its PNG came from
+# the cache, a miss when it was drawn.
+def bar_chart(data, x, y, **options):
+    with substage("bar_chart", rows=len(data), cached=True):
+        st.image(bar_png(data, x, y, **options), width="stretch")
+
+
+def heatmap(data, **options):
+    with substage("heatmap", rows=len(data), cached=True):
+        st.image(heatmap_png(data, **options), width="stretch")
@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from baselines import SEASON, points, right_aligned
+from batch_forecast import COLUMNS, DEFAULT_WORKERS, MIN_POINTS, ORDER, SEASONAL_ORDER, monthly_series, process_pool
+from next_purchase import KEYS
+
+SHAPE_MONTHS = 2 * SEASON
+KMEANS_ITERATIONS = 50
+DISTANCE_BLOCK = 8192
+
+
+# -------------------------------
+# SERIES SHAPES
+# -------------------------------
+# Every series z-normalized by its own mean and spread, so series that move
+# alike are close whatever their volume. Flat series keep a spread of 1, and
+# the months before a series started are 0 - the series' mean.
+def normalize(matrix):
+    mean = np.nansum(matrix, axis=1) / np.maximum(points(matrix), 1)
+    spread = np.sqrt(np.nansum((matrix - mean[:, None]) ** 2, axis=1) / np.maximum(points(matrix), 1))
+    scale = np.where(spread > 0, spread, 1.0)
+    return mean, scale, np.nan_to_num((matrix - mean[:, None]) / scale[:, None])
+
+
+# Nearest center of every point and the squared distance to it, from
+# |x|^2 - 2 x.c + |c|^2 as one matrix product per block of rows, so memory
+# stays at DISTANCE_BLOCK x centers whatever the number of series.
+def nearest_centers(shapes, centers, block=DISTANCE_BLOCK):
+    labels = np.empty(len(shapes), dtype=np.int64)
+    distances = np.empty(len(shapes))
+    center_norms = (centers ** 2).sum(axis=1)
+    for start in range(0, len(shapes), block):
+        rows = shapes[start:start + block]
+        squared = (rows ** 2).sum(axis=1)[:, None] - 2 * rows @ centers.T + center_norms
+        labels[start:start + block] = squared.argmin(axis=1)
+        distances[start:start + block] = np.maximum(squared[np.arange(len(rows)), labels[start:start + block]], 0)
+    return labels, distances
+
+
+# -------------------------------
+# K-MEANS
+# -------------------------------
+# k-means++ seeding - each next center drawn with probability proportional to
+# the squared distance to the nearest center so far - then Lloyd iterations
+# until no series changes cluster. Empty clusters keep their old center.
+# Returns each series' cluster and each cluster's medoid: the member nearest
+# to the center, which is the series its model is fitted on.
+def kmeans(shapes, n_clusters, seed=0, iterations=KMEANS_ITERATIONS):
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(shapes))
+    centers = shapes[[rng.integers(len(shapes))]]
+    _, nearest = nearest_centers(shapes, centers)
+    for _ in range(1, n_clusters):
+        total = nearest.sum()
+        pick = rng.choice(len(shapes), p=nearest / total) if total > 0 else rng.integers(len(shapes))
+        centers = np.vstack([centers, shapes[pick]])
+        nearest = np.minimum(nearest, nearest_centers(shapes, shapes[[pick]])[1])
+
+    labels = None
+    for _ in range(iterations):
+        new_labels, distances = nearest_centers(shapes, centers)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=n_clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, shapes)
+        centers = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+
+    order = np.lexsort((distances, labels))
+    first = np.r_[True, labels[order][1:] != labels[order][:-1]]
+    medoids = np.full(n_clusters, -1)
+    medoids[labels[order][first]] = order[first]
+    return labels, medoids
+
+
+# -------------------------------
+# ONE MODEL PER CLUSTER
+# -------------------------------
+# SARIMAX fitted once on the cluster's medoid, then run through the Kalman
+# filter with those parameters on every member - a filter pass instead of a
+# fit per series. All series are z-normalized, so the medoid's parameters fit
+# members of any volume; values come back normalized. Members the filter
+# fails on, or all of them when the fit fails, get 0 - their mean - as Avg.
+def cluster_forecast(medoid, members, order=ORDER, seasonal_order=SEASONAL_ORDER):
+    try:
+        params = SARIMAX(medoid, order=order, seasonal_order=seasonal_order).fit(disp=False).params
+    except Exception:
+        return [(0.0, "Avg")] * len(members)
+    results = []
+    for ts in members:
+        try:
+            result = SARIMAX(ts, order=order, seasonal_order=seasonal_order).filter(params)
+            results.append((result.forecast(steps=1).iloc[0], "Cluster SARIMA"))
+        except Exception:
+            results.append((0.0, "Avg"))
+    return results
+
+
+# Series with at least min_points months are clustered on the shape of their
+# last SHAPE_MONTHS months; shorter ones get their mean as Est Avg, as in
+# batch_forecast. Same columns as batch_forecast plus the Cluster of every
+# series (-1 when it was not clustered). One pool task per cluster.
+def forecast_clusters(series, n_clusters, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, seed=0):
+    keys, values = list(series), list(series.values())
+    matrix = right_aligned(series)
+    mean, scale, normalized = normalize(matrix)
+    frame = pd.DataFrame(keys, columns=KEYS)
+    frame["Forecast"] = mean
+    frame["Method"] = "Est Avg"
+    frame["Points"] = points(matrix)
+    frame["Cluster"] = -1
+    fitted = np.flatnonzero(frame["Points"].to_numpy() >= min_points)
+    if not len(fitted) or n_clusters < 1:
+        return frame[COLUMNS + ["Cluster"]]
+
+    labels, medoids = kmeans(normalized[fitted, -SHAPE_MONTHS:], n_clusters, seed)
+    scaled = [(values[i] - mean[i]) / scale[i] for i in fitted]
+    clusters = [c for c in range(len(medoids)) if medoids[c] >= 0]
+    members = [np.flatnonzero(labels == c) for c in clusters]
+    args = ([scaled[medoids[c]] for c in clusters], [[scaled[m] for m in group] for group in members])
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(clusters) < 2:
+        results = list(map(cluster_forecast, *args))
+    else:
+        with process_pool(workers) as pool:
+            results = list(pool.map(cluster_forecast, *args))
+
+    rows = fitted[np.concatenate(members)]
+    value, method = zip(*(result for group in results for result in group))
+    frame.loc[rows, "Forecast"] = mean[rows] + scale[rows] * np.asarray(value, dtype="float64")
+    frame.loc[rows, "Method"] = method
+    frame.loc[rows, "Cluster"] = np.repeat(clusters, [len(group) for group in members])
+    return frame[COLUMNS + ["Cluster"]]
+
+
+def clustered_forecast(df, n_clusters, customers=None, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, seed=0):
+    return forecast_clusters(monthly_series(df, customers), n_clusters, max_workers, min_points, seed)
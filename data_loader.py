@@ -0,0 +1,101 @@
+import os
+import threading
+
+import pandas as pd
+from sqlalchemy import text
+
+from schema import append_rows, compact_dtypes
+
+CHUNK_ROWS = int(os.environ.get("INGEST_CHUNK_ROWS", "200000"))
+
+
+def quote(conn, name):
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+# Column names in the tables carry stray whitespace and Date may come back as
+# text; every frame read from a table goes through here.
+def tidy(raw, date_column="Date"):
+    raw.columns = raw.columns.str.strip()
+    raw[date_column] = pd.to_datetime(raw[date_column], errors="coerce")
+    return compact_dtypes(raw)
+
+
+# -------------------------------
+# CHUNKED READS
+# -------------------------------
+# The table as a stream of tidied frames of at most chunksize rows. yield_per
+# asks the driver for a server-side cursor (a named cursor on PostgreSQL), so
+# neither the driver nor pandas ever holds more than one chunk.
+def read_chunks(conn, table, chunksize=CHUNK_ROWS, date_column="Date"):
+    query = text(f"SELECT * FROM {quote(conn, table)}").execution_options(yield_per=chunksize)
+    for raw in pd.read_sql(query, conn, chunksize=chunksize):
+        yield tidy(raw, date_column)
+
+
+# Same rows in any order, whatever the dtypes they are held in.
+def same_rows(held, fetched):
+    if len(held) != len(fetched) or set(held.columns) != set(fetched.columns):
+        return False
+    columns = list(held.columns)
+    hashes = [pd.util.hash_pandas_object(frame[columns].astype(object), index=False).sort_values().to_numpy()
+              for frame in (held, fetched)]
+    return (hashes[0] == hashes[1]).all()
+
+
+# -------------------------------
+# INCREMENTAL TABLE LOADER
+# -------------------------------
+# Keeps the frame it has already loaded and only asks the database for rows at
+# or after the last seen Date. Rows on the watermark date itself are fetched
+# again and replace the ones held, so same-day rows that arrive late are not
+# lost. With a strictly increasing watermark column (an id or inserted_at)
+# only rows past the watermark are fetched.
+class IncrementalLoader:
+    def __init__(self, conn, table, date_column="Date", watermark_column=None):
+        self.conn = conn
+        self.table = table
+        self.date_column = date_column
+        self.watermark_column = watermark_column
+        self.frame = None
+        self.watermark = None
+        self._lock = threading.Lock()
+
+    def _read(self, where="", params=None):
+        query = f"SELECT * FROM {quote(self.conn, self.table)} {where}"
+        raw = pd.read_sql(text(query), self.conn, params=params)
+        # column names in the table carry stray whitespace; keep the originals for the WHERE clause
+        self._raw_columns = dict(zip(raw.columns.str.strip(), raw.columns))
+        column = self._raw_columns[self.watermark_column or self.date_column]
+        # NULLs come back as None next to text dates on SQLite
+        values = raw[column].dropna()
+        mark = values.max() if not values.empty else None
+        # numpy scalars are not valid bind parameters for every driver
+        mark = mark.item() if hasattr(mark, "item") else mark
+        return tidy(raw, self.date_column), mark
+
+    def load(self, full=False):
+        with self._lock:
+            if full or self.frame is None or self.watermark is None:
+                self.frame, self.watermark = self._read()
+                return self.frame
+
+            column = quote(self.conn, self._raw_columns[self.watermark_column or self.date_column])
+            if self.watermark_column:
+                new, mark = self._read(f"WHERE {column} > :mark", {"mark": self.watermark})
+                kept = self.frame
+            else:
+                new, mark = self._read(f"WHERE {column} >= :mark", {"mark": self.watermark})
+                same_day = self.frame[self.date_column] == pd.to_datetime(self.watermark, errors="coerce")
+                # nothing past the watermark and the watermark date unchanged:
+                # hand back the same frame, so callers can tell nothing changed
+                if mark == self.watermark and same_rows(self.frame[same_day], new):
+                    return self.frame
+                kept = self.frame[~same_day]
+            if not new.empty:
+                self.frame = append_rows(kept, new)
+                self.watermark = max(self.watermark, mark)
+            return self.frame
+
+    def reload(self):
+        return self.load(full=True)
@@ -0,0 +1,109 @@
+import collections
+import os
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "120000"))
+WAIT_SAMPLES = 1000
+
+_engines = {}
+_lock = threading.Lock()
+
+
+# -------------------------------
+# CONFIG
+# -------------------------------
+# $<NAME>_DATABASE_URL, else url under [connections.<name>] in Streamlit's
+# secrets.toml, else $DATABASE_URL.
+def database_url(name):
+    url = os.environ.get(f"{name.upper()}_DATABASE_URL")
+    if url:
+        return url
+    try:
+        import streamlit as st
+        return st.secrets["connections"][name]["url"]
+    except (ImportError, KeyError, FileNotFoundError):
+        pass
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        raise RuntimeError(f"no database configured for {name}: set ${name.upper()}_DATABASE_URL "
+                           f"or [connections.{name}] url in .streamlit/secrets.toml")
+    return url
+
+
+# -------------------------------
+# POOL CHECKOUT METRICS
+# -------------------------------
+# QueuePool that times how long each checkout waited for a free connection;
+# the last WAIT_SAMPLES waits are kept for percentiles.
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waits = collections.deque(maxlen=WAIT_SAMPLES)
+        self.checkouts = 0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkouts += 1
+            self.waits.append(time.perf_counter() - start)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.waits, pool.checkouts, pool.timeouts = self.waits, self.checkouts, self.timeouts
+        return pool
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    waits = np.array(getattr(pool, "waits", ()), dtype="float64") * 1000
+    return {
+        "size": pool.size() if hasattr(pool, "size") else None,
+        "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+        "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+        "checkouts": getattr(pool, "checkouts", None),
+        "timeouts": getattr(pool, "timeouts", None),
+        "wait_p50_ms": float(np.percentile(waits, 50)) if len(waits) else None,
+        "wait_p95_ms": float(np.percentile(waits, 95)) if len(waits) else None,
+        "wait_max_ms": float(waits.max()) if len(waits) else None,
+    }
+
+
+# -------------------------------
+# POOLED ENGINE
+# -------------------------------
+# One engine per database and process. Every query checks a connection out
+# of the pool for its own duration, so sessions and the snapshot refresher
+# run side by side; pre-ping replaces connections the server dropped, and
+# recycle retires them before server-side idle timeouts do. On PostgreSQL
+# each statement is cancelled after STATEMENT_TIMEOUT_MS.
+def make_engine(url, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, pool_timeout=POOL_TIMEOUT,
+                pool_recycle=POOL_RECYCLE, statement_timeout_ms=STATEMENT_TIMEOUT_MS):
+    connect_args = {}
+    if make_url(url).get_backend_name() == "postgresql" and statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    return create_engine(url, poolclass=TimedQueuePool, pool_size=pool_size, max_overflow=max_overflow,
+                         pool_timeout=pool_timeout, pool_recycle=pool_recycle, pool_pre_ping=True,
+                         connect_args=connect_args)
+
+
+def database(name):
+    with _lock:
+        if name not in _engines:
+            _engines[name] = make_engine(database_url(name))
+        return _engines[name]
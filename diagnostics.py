@@ -0,0 +1,127 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from db import pool_stats
+
+LOGGER = logging.getLogger("foodf.diagnostics")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_current = contextvars.ContextVar("diagnostics_stage", default=None)
+_recorder = contextvars.ContextVar("diagnostics_recorder", default=None)
+
+if not LOGGER.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(os.environ.get("DIAGNOSTICS_LOG_LEVEL", "INFO"))
+    LOGGER.propagate = False
+
+
+# Resident set size from /proc; None where there is no /proc.
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# -------------------------------
+# STAGE TIMINGS
+# -------------------------------
+# One recorder per script run. Every stage is logged as a JSON line when it
+# ends and kept for the sidebar panel. Stages nest: a tab wrapping a cached
+# load shows both.
+class Diagnostics:
+    def __init__(self, app):
+        self.app = app
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None, cached=False):
+        record = {"app": self.app, "stage": name, "rows": rows, "cache": "hit" if cached else None}
+        parent = _current.get()
+        record["depth"] = 0 if parent is None else parent["depth"] + 1
+        self.records.append(record)
+        token, recorder = _current.set(record), _recorder.set(self)
+        memory, start = rss_mb(), time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            after = rss_mb()
+            record["memory_mb"] = None if memory is None or after is None else round(after - memory, 1)
+            _current.reset(token)
+            _recorder.reset(recorder)
+            LOGGER.info(json.dumps({key: value for key, value in record.items() if key != "depth"}, default=str))
+
+    def frame(self):
+        columns = ["stage", "seconds", "rows", "cache", "memory_mb"]
+        frame = pd.DataFrame(self.records, columns=columns + ["depth"])
+        frame["stage"] = ["  " * depth + stage for stage, depth in zip(frame["stage"], frame["depth"])]
+        frame["rows"] = frame["rows"].astype("Int64")
+        return frame[columns]
+
+
+# A stage of whichever recorder has a stage open in this script run, for
+# shared code that has no Diagnostics of its own (cached builders, charts).
+# Outside a stage it only runs the block.
+@contextmanager
+def substage(name, rows=None, cached=False):
+    diagnostics = _recorder.get()
+    if diagnostics is None:
+        yield {"rows": rows}
+        return
+    with diagnostics.stage(name, rows=rows, cached=cached) as record:
+        yield record
+
+
+# Marks the enclosing stage as a cache miss. Goes under a cache decorator,
+# so it only runs when the cache actually calls the function; a stage opened
+# with cached=True stays a hit unless this runs inside it.
+def tracks_misses(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        record = _current.get()
+        if record is not None:
+            record["cache"] = "miss"
+        return func(*args, **kwargs)
+    return wrapper
+
+
+# -------------------------------
+# SIDEBAR PANEL
+# -------------------------------
+# Drawn last in the script so every stage of this run is in the table.
+def panel(diagnostics, store=None, jobs=None, engine=None):
+    if not st.sidebar.checkbox("Show diagnostics"):
+        return
+    with st.sidebar.expander("Diagnostics", expanded=True):
+        st.dataframe(diagnostics.frame(), hide_index=True)
+        total = sum(record["seconds"] for record in diagnostics.records if record["depth"] == 0)
+        memory = rss_mb()
+        st.caption(f"Script run: {total:.2f}s" + ("" if memory is None else f", RSS {memory:.0f} MB"))
+        if store is not None:
+            st.caption(f"Forecast store: {store.hits} hits / {store.misses} misses")
+        if jobs is not None:
+            # SARIMAX fits run in the worker processes, outside every stage
+            finished, total = jobs.progress()
+            seconds = jobs.status().query("State == 'done'")["Seconds"]
+            line = f"Forecast jobs: {finished}/{total} done"
+            if len(seconds):
+                line += f", SARIMAX fit {seconds.mean():.1f}s mean / {seconds.max():.1f}s max incl. queueing"
+            st.caption(line)
+        if engine is not None:
+            pool = pool_stats(engine)
+            line = f"DB pool: {pool['checked_out']}/{pool['size']} checked out, {pool['checkouts']} checkouts"
+            if pool["wait_p50_ms"] is not None:
+                line += (f", wait p50 {pool['wait_p50_ms']:.1f} / p95 {pool['wait_p95_ms']:.1f}"
+                         f" / max {pool['wait_max_ms']:.1f} ms")
+            st.caption(line + (f", {pool['timeouts']} timeouts" if pool["timeouts"] else ""))
@@ -0,0 +1,152 @@
+import argparse
+import time
+import warnings
+from functools import partial
+
+import pandas as pd
+from sqlalchemy import create_engine, inspect
+
+from batch_forecast import DEFAULT_WORKERS, MIN_POINTS, batch_forecast
+from clustering import clustered_forecast
+from data_loader import IncrementalLoader
+from db import database_url
+from forecast_store import DEFAULT_PATH, FULL_REFIT_AGE, ForecastStore
+from hierarchical import hierarchical_forecast
+from next_purchase import purchase_gap_stats
+from streaming import stream_table
+from tiering import tiered_forecast
+
+
+# Database each sales table is in, named as the dashboards name it, so the
+# batch run resolves the same URL they do.
+TABLE_DATABASES = {"ramp": "ramp", "final_fooddata": "fooddata"}
+
+
+# -------------------------------
+# PRECOMPUTED RESULTS
+# -------------------------------
+# Written by the batch run below, read by the dashboards. Both tables are
+# replaced inside one transaction, so readers never see a half-written run.
+# One pair of tables per source table, next to it in the same database.
+def result_tables(table):
+    return f"{table}_forecasts", f"{table}_next_purchase"
+
+
+# df is either the raw rows or the monthly rows of a streamed table, which
+# forecast the same; next_purchase is then the streamed gap stats.
+# hierarchical fits per product and splits the forecasts to the customers;
+# clusters fits one model per cluster of alike series (the store is not used).
+def precompute(df, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, store=None, incremental=False,
+               tiered=True, next_purchase=None, hierarchical=False, reconcile=False, clusters=None):
+    generated = pd.Timestamp.now().floor("s")
+    forecast = tiered_forecast if tiered else batch_forecast
+    if hierarchical:
+        forecast = partial(hierarchical_forecast, reconcile=reconcile)
+    if clusters:
+        forecasts = clustered_forecast(df, clusters, max_workers=max_workers, min_points=min_points)
+    else:
+        forecasts = forecast(df, max_workers=max_workers, min_points=min_points, store=store, incremental=incremental)
+    if next_purchase is None:
+        next_purchase = purchase_gap_stats(df)
+    for frame in (forecasts, next_purchase):
+        frame["Customer ID"] = frame["Customer ID"].astype(str)
+        frame["Product"] = frame["Product"].astype(str)
+        frame["Generated At"] = generated
+    return forecasts, next_purchase
+
+
+def write_results(conn, table, forecasts, next_purchase):
+    forecast_table, next_purchase_table = result_tables(table)
+    forecasts.to_sql(forecast_table, conn, if_exists="replace", index=False, chunksize=10_000)
+    next_purchase.to_sql(next_purchase_table, conn, if_exists="replace", index=False, chunksize=10_000)
+
+
+def read_results(conn, table):
+    forecast_table, next_purchase_table = result_tables(table)
+    tables = inspect(conn)
+    if not (tables.has_table(forecast_table) and tables.has_table(next_purchase_table)):
+        return None
+    forecasts = pd.read_sql_table(forecast_table, conn, parse_dates=["Generated At"])
+    next_purchase = pd.read_sql_table(
+        next_purchase_table, conn, parse_dates=["Last Purchase", "Next Purchase", "Generated At"]
+    )
+    if forecasts.empty:
+        return None
+    return forecasts, next_purchase
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute stock and next-purchase forecasts for every customer x product.")
+    parser.add_argument("--db-url", default=None,
+                        help="source database (default: the table's database, resolved like the dashboards do: "
+                             "$<NAME>_DATABASE_URL, [connections.<name>] in .streamlit/secrets.toml, $DATABASE_URL)")
+    parser.add_argument("--table", default="ramp", help="sales table to forecast from")
+    parser.add_argument("--results-url", default=None, help="database to write results to (default: --db-url)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="fitting processes (default: all cores)")
+    parser.add_argument("--min-points", type=int, default=MIN_POINTS, help="months of history needed for SARIMA")
+    parser.add_argument("--store", default=None,
+                        help=f"forecast store file; unchanged series are not refitted (default: {DEFAULT_PATH})")
+    parser.add_argument("--no-store", action="store_true", help="refit every series")
+    parser.add_argument("--sarima-only", action="store_true",
+                        help="fit SARIMA for every series instead of only the SARIMA tier")
+    parser.add_argument("--full-refit", action="store_true",
+                        help="drop stored model states so changed series are fitted from scratch")
+    parser.add_argument("--hierarchical", action="store_true",
+                        help="fit one model per product and split it to customers by their share of the product")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="with --hierarchical, split by the customers' own baseline forecasts instead of their shares")
+    parser.add_argument("--clusters", type=int, default=None,
+                        help="cluster the series into this many groups and fit one SARIMA per group")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the table in chunks of this many rows instead of loading it whole")
+    args = parser.parse_args(argv)
+    if not args.db_url:
+        try:
+            args.db_url = database_url(TABLE_DATABASES.get(args.table, args.table))
+        except RuntimeError as exc:
+            parser.error(f"{exc}, or pass --db-url")
+    # options the chosen forecast would otherwise silently ignore
+    if args.clusters is not None:
+        if args.clusters < 1:
+            parser.error("--clusters must be at least 1")
+        for flag, given in (("--hierarchical", args.hierarchical), ("--sarima-only", args.sarima_only),
+                            ("--store", args.store is not None), ("--full-refit", args.full_refit)):
+            if given:
+                parser.error(f"--clusters cannot be combined with {flag}")
+    if args.reconcile and not args.hierarchical:
+        parser.error("--reconcile only applies with --hierarchical")
+    if args.hierarchical and args.sarima_only:
+        parser.error("--sarima-only cannot be combined with --hierarchical, which always fits by tier")
+
+    # SARIMAX start-parameter warnings, once per series
+    warnings.filterwarnings("ignore")
+    started = time.perf_counter()
+    source = create_engine(args.db_url)
+    with source.connect() as conn:
+        if args.chunksize:
+            streamed = stream_table(conn, args.table, args.chunksize)
+            df, next_purchase, rows = streamed.monthly(), streamed.gap_stats(), streamed.rows
+        else:
+            df = IncrementalLoader(conn, args.table).load()
+            next_purchase, rows = None, len(df)
+    print(f"loaded {rows:,} rows from {args.table} in {time.perf_counter() - started:.1f}s")
+
+    store = None if args.no_store or args.clusters else ForecastStore(args.store or DEFAULT_PATH)
+    if store is not None:
+        store.evict(model_age=0 if args.full_refit else FULL_REFIT_AGE)
+    forecasts, next_purchase = precompute(df, max_workers=args.workers, min_points=args.min_points, store=store,
+                                          incremental=store is not None, tiered=not args.sarima_only,
+                                          next_purchase=next_purchase, hierarchical=args.hierarchical,
+                                          reconcile=args.reconcile, clusters=args.clusters)
+    fits = forecasts["Fit"].value_counts().to_dict() if "Fit" in forecasts else {}
+    print(f"forecast {len(forecasts):,} series ({forecasts['Method'].value_counts().to_dict()}, fits {fits}) "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    target = create_engine(args.results_url) if args.results_url else source
+    with target.begin() as conn:
+        write_results(conn, args.table, forecasts, next_purchase)
+    print(f"wrote {' and '.join(result_tables(args.table))} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
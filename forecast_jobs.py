@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+import pandas as pd
+
+from batch_forecast import DEFAULT_WORKERS, MIN_POINTS, ORDER, SEASONAL_ORDER, forecast_series, process_pool
+from forecast_store import series_key
+
+KEEP_FINISHED = 3600
+MAX_RESULTS = int(os.environ.get("FORECAST_JOB_RESULTS", "20000"))
+
+
+# -------------------------------
+# BACKGROUND FORECAST JOBS
+# -------------------------------
+# One runner per process, shared by every session. Series are keyed the same
+# way as in the ForecastStore, so a series that is already fitted, stored, or
+# still being fitted for another session is never submitted twice - changing
+# the selected customer does not restart fits that are in flight. Results are
+# kept for the MAX_RESULTS most recently used series; older ones are read back
+# from the store (or refitted without one) when a page asks again.
+class ForecastJobs:
+    def __init__(self, store=None, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, max_results=MAX_RESULTS):
+        self.store = store
+        self.min_points = min_points
+        self.max_results = max_results
+        self._pool = process_pool(max_workers)
+        self._results = OrderedDict()
+        self._jobs = {}
+        self._lock = threading.RLock()
+
+    def submit(self, series):
+        keys = {pair: series_key(ts, ORDER, SEASONAL_ORDER, self.min_points) for pair, ts in series.items()}
+        with self._lock:
+            self._forget_finished()
+            unknown = [key for key in set(keys.values()) if key not in self._results and key not in self._jobs]
+        cached = self.store.get_many(unknown) if self.store is not None and unknown else {}
+
+        fit = partial(forecast_series, min_points=self.min_points)
+        with self._lock:
+            for key, result in cached.items():
+                self._remember(key, result)
+            for pair, ts in series.items():
+                key = keys[pair]
+                if key in self._results or key in self._jobs:
+                    continue
+                self._jobs[key] = {
+                    "Customer ID": pair[0], "Product": pair[1],
+                    "future": self._pool.submit(fit, ts), "submitted": time.time(), "finished": None,
+                }
+                self._jobs[key]["future"].add_done_callback(partial(self._finished, key, ts))
+        return keys
+
+    def _finished(self, key, ts, future):
+        try:
+            result = future.result()
+        except Exception:
+            # the worker itself died; same fallback as a failed fit
+            result = (ts.mean(), "Avg")
+        with self._lock:
+            self._remember(key, result)
+            self._jobs[key]["finished"] = time.time()
+        if self.store is not None:
+            self.store.put(key, *result)
+
+    def _forget_finished(self):
+        cutoff = time.time() - KEEP_FINISHED
+        for key in [key for key, job in self._jobs.items() if job["finished"] and job["finished"] < cutoff]:
+            del self._jobs[key]
+
+    def _remember(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_results:
+            old, _ = self._results.popitem(last=False)
+            # a finished job without its result would never be resubmitted
+            if old in self._jobs and self._jobs[old]["finished"] is not None:
+                del self._jobs[old]
+
+    def result(self, key):
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+            return self._results.get(key)
+
+    def done(self, keys):
+        keys = keys.values() if isinstance(keys, dict) else keys
+        with self._lock:
+            return all(key in self._results for key in keys)
+
+    def progress(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sum(job["finished"] is not None for job in jobs), len(jobs)
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        rows = []
+        for job in jobs:
+            if job["finished"] is not None:
+                state, seconds = "done", job["finished"] - job["submitted"]
+            else:
+                state, seconds = ("running" if job["future"].running() else "queued"), now - job["submitted"]
+            rows.append((job["Customer ID"], job["Product"], state, round(seconds, 1)))
+        return pd.DataFrame(rows, columns=["Customer ID", "Product", "State", "Seconds"])
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_PATH = os.environ.get("FORECAST_STORE", "forecast_store.sqlite")
+MAX_AGE = float(os.environ.get("FORECAST_STORE_MAX_AGE_DAYS", "30")) * 86_400
+MAX_ENTRIES = int(os.environ.get("FORECAST_STORE_MAX_ENTRIES", "200000"))
+FULL_REFIT_AGE = float(os.environ.get("FORECAST_FULL_REFIT_DAYS", "90")) * 86_400
+
+
+# A series is identified by its month index, its values and every setting
+# that changes the forecast, so an unchanged series never needs a refit.
+def series_key(ts, *settings):
+    digest = hashlib.sha256(repr(settings).encode())
+    digest.update(ts.index.asi8.tobytes())
+    digest.update(np.ascontiguousarray(ts.to_numpy(dtype="float64")).tobytes())
+    return digest.hexdigest()
+
+
+# Fitted model state belongs to a (customer, product) pair rather than to one
+# version of its series - it is what the next month's update starts from.
+def series_id(pair, *settings):
+    return hashlib.sha256(repr((tuple(map(str, pair)), settings)).encode()).hexdigest()
+
+
+# -------------------------------
+# PERSISTENT FORECAST STORE
+# -------------------------------
+# SQLite file on local disk; one short-lived connection per call so the store
+# can be shared by threads, processes and replicas mounting the same volume.
+class ForecastStore:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS forecasts ("
+                "key TEXT PRIMARY KEY, value REAL, method TEXT, created REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS forecasts_accessed ON forecasts (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS models (series TEXT PRIMARY KEY, state TEXT, full_fit REAL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, keys):
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, value, method FROM forecasts WHERE key IN ({marks})", chunk)
+                # SQLite stores NaN as NULL
+                found.update((key, (np.nan if value is None else value, method)) for key, value, method in rows)
+            conn.executemany("UPDATE forecasts SET accessed = ? WHERE key = ?", [(time.time(), key) for key in found])
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?)",
+                [(key, float(value), method, now, now) for key, (value, method) in items.items()],
+            )
+
+    def put(self, key, value, method):
+        self.put_many({key: (value, method)})
+
+    def get_models(self, series):
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(series), 500):
+                chunk = series[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT series, state FROM models WHERE series IN ({marks})", chunk)
+                found.update((name, json.loads(state)) for name, state in rows)
+        return found
+
+    def put_models(self, states):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO models VALUES (?, ?, ?)",
+                [(name, json.dumps(state), state["full_fit"]) for name, state in states.items()],
+            )
+
+    # Age is measured from when the forecast was fitted; the size limit drops
+    # the least recently read entries first. Model states are dropped once
+    # they are due for a full refit anyway.
+    def evict(self, max_age=MAX_AGE, max_entries=MAX_ENTRIES, model_age=FULL_REFIT_AGE):
+        removed = 0
+        with self._connect() as conn:
+            if model_age is not None:
+                removed += conn.execute("DELETE FROM models WHERE full_fit < ?", (time.time() - model_age,)).rowcount
+            if max_age is not None:
+                removed += conn.execute("DELETE FROM forecasts WHERE created < ?", (time.time() - max_age,)).rowcount
+            if max_entries is not None:
+                removed += conn.execute(
+                    "DELETE FROM forecasts WHERE key NOT IN "
+                    "(SELECT key FROM forecasts ORDER BY accessed DESC LIMIT ?)", (max_entries,)
+                ).rowcount
+        return removed
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM forecasts")
+            conn.execute("DELETE FROM models")
+
+    def stats(self):
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+            models = conn.execute("SELECT COUNT(*) FROM models").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "models": models}
@@ -0,0 +1,71 @@
+import pandas as pd
+import streamlit as st
+
+from diagnostics import substage
+
+
+def show_forecast(prod, forecast, method):
+    label = prod if method == "SARIMA" else f"{prod} ({method})"
+    st.metric(label=label, value=f"{forecast:.2f}")
+
+
+# -------------------------------
+# PRECOMPUTED FORECASTS
+# -------------------------------
+# The batch run's forecasts for the given customers, one subheader per
+# customer unless headers is off.
+def render_precomputed(forecasts, customers, headers=True):
+    st.caption(f"Precomputed by the batch run at {forecasts['Generated At'].max():%Y-%m-%d %H:%M}")
+    shown = forecasts[forecasts["Customer ID"].isin(pd.Index(customers).astype(str))]
+    for cust_id, rows in shown.groupby("Customer ID", sort=False):
+        if headers:
+            st.subheader(f"Customer ID: {cust_id}")
+        for prod, forecast, method in rows[["Product", "Forecast", "Method"]].itertuples(index=False):
+            show_forecast(prod, forecast, method)
+
+
+# -------------------------------
+# LIVE STOCK FORECAST
+# -------------------------------
+# One metric per (customer, product) series. baseline holds the
+# baseline_forecasts of the fitted series - series itself unless nodes is
+# given, as it is for a Hierarchy, where owner[i] is the node of series i
+# and shares[i] its part of the node's forecast. Only fitted series in the
+# SARIMA tier go to the jobs; until a fit lands its baseline stands in.
+def render_stock_forecast(jobs, series, baseline, nodes=None, owner=None, shares=None, headers=True):
+    nodes = series if nodes is None else nodes
+    owner = range(len(series)) if owner is None else owner
+    shares = [1.0] * len(series) if shares is None else shares
+    node_keys = list(nodes)
+    stand_ins = list(baseline[["Forecast", "Method"]].itertuples(index=False))
+    sarima = {key: nodes[key] for key, tier in zip(nodes, baseline["Tier"]) if tier == "SARIMA"}
+    with substage("sarimax_submit", rows=len(sarima)):
+        forecast_keys = jobs.submit(sarima)
+    fits_pending = not jobs.done(forecast_keys)
+
+    # fits run in the background; this section polls until the last one lands,
+    # and changing the selection leaves them running
+    @st.fragment(run_every=2 if fits_pending else None)
+    def stock_forecast():
+        finished, total = jobs.progress()
+        st.progress(finished / total if total else 1.0, text=f"Forecast jobs: {finished}/{total} done")
+        with st.expander("Forecast job status"):
+            st.dataframe(jobs.status())
+        if jobs.store is not None:
+            st.caption(f"Forecast store: {jobs.store.hits} hits / {jobs.store.misses} misses")
+        shown_customer = None
+        for (cust_id, prod), node, share in zip(series, owner, shares):
+            if headers and cust_id != shown_customer:
+                st.subheader(f"Customer ID: {cust_id}")
+                shown_customer = cust_id
+            key = forecast_keys.get(node_keys[node])
+            result = tuple(stand_ins[node]) if key is None else jobs.result(key)
+            if result is None:
+                st.metric(label=f"{prod} (fitting...)", value=f"{share * stand_ins[node].Forecast:.2f}")
+                continue
+            forecast, method = result
+            show_forecast(prod, share * forecast, method)
+        if fits_pending and jobs.done(forecast_keys):
+            st.rerun()
+
+    stock_forecast()
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from batch_forecast import COLUMNS, DEFAULT_WORKERS, MIN_POINTS, monthly_values, series_from_values
+from next_purchase import KEYS
+from tiering import baseline_forecasts, forecast_tiers
+
+SHARE_MONTHS = 12
+ALL_CUSTOMERS = "All Customers"
+
+
+# -------------------------------
+# PRODUCT HIERARCHY
+# -------------------------------
+# The (customer, product) monthly series and, above them, one series per
+# (segment, product) node: the month-by-month sum of its customers' series.
+# Without segments every customer is in one segment, so a node is a product.
+# node[i] is the node of pair i and shares[i] the pair's part of the node's
+# quantity over the node's last SHARE_MONTHS months - or over all of its
+# history when those months are all zero, or an equal split when that is
+# zero as well.
+class Hierarchy:
+    def __init__(self, df, customers=None, segments=None, share_months=SHARE_MONTHS):
+        parts = monthly_values(df, customers)
+        if parts is None:
+            self.pairs, self.nodes = {}, {}
+            self.node, self.shares = np.zeros(0, dtype=np.int64), np.zeros(0)
+            return
+        pairs, lo, span, offset, values = parts
+        segment = [ALL_CUSTOMERS if segments is None else segments.get(customer, ALL_CUSTOMERS)
+                   for customer in pairs["Customer ID"]]
+        self.node, nodes = pd.MultiIndex.from_arrays([segment, pairs["Product"]]).factorize()
+        n_nodes = len(nodes)
+
+        # month of every value, and the node's first and last month
+        rows = np.repeat(np.arange(len(pairs)), span)
+        months = lo[rows] + np.arange(len(values)) - offset[rows]
+        node_lo = np.full(n_nodes, lo.max())
+        node_hi = np.full(n_nodes, (lo + span).min() - 1)
+        np.minimum.at(node_lo, self.node, lo)
+        np.maximum.at(node_hi, self.node, lo + span - 1)
+        node_span = node_hi - node_lo + 1
+        node_offset = np.r_[0, np.cumsum(node_span)[:-1]]
+        node_values = np.zeros(node_span.sum(), dtype=values.dtype)
+        value_node = self.node[rows]
+        np.add.at(node_values, node_offset[value_node] + months - node_lo[value_node], values)
+
+        self.pairs = series_from_values(pairs, lo, span, offset, values)
+        self.nodes = series_from_values(pd.DataFrame(list(nodes), columns=["Segment", "Product"]),
+                                        node_lo, node_span, node_offset, node_values)
+        recent = months > node_hi[value_node] - share_months
+        shares = self._shares(np.bincount(rows[recent], values[recent], len(pairs)))
+        history = self._shares(np.bincount(rows, values, len(pairs)))
+        equal = 1 / np.bincount(self.node)[self.node]
+        self.shares = np.where(np.isnan(shares), np.where(np.isnan(history), equal, history), shares)
+
+    # Each pair's part of its node's total; NaN where the total is not positive.
+    def _shares(self, amounts):
+        totals = np.bincount(self.node, amounts, len(self.nodes))[self.node]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(totals > 0, amounts / totals, np.nan)
+
+    # Node forecasts split over their pairs. With bottom-level forecasts the
+    # split follows those instead of the history (forecast proportions), so
+    # the pairs of a node still add up to the node's forecast.
+    def disaggregate(self, node_forecasts, bottom=None):
+        shares = self.shares
+        if bottom is not None:
+            proportions = self._shares(np.clip(np.nan_to_num(np.asarray(bottom, dtype="float64")), 0, None))
+            shares = np.where(np.isnan(proportions), shares, proportions)
+        return shares * np.asarray(node_forecasts, dtype="float64")[self.node]
+
+
+# -------------------------------
+# HIERARCHICAL FORECAST
+# -------------------------------
+# Tiered forecasts for the node series only - one SARIMA fit per product (or
+# segment and product) instead of per customer and product - split top-down
+# to the customers. With reconcile, each node's forecast is split in
+# proportion to the pairs' own baseline forecasts rather than their
+# historical shares. Same columns as tiered_forecast; Method says how the
+# node was forecast and how it was split, Tier and Fit are the node's.
+def hierarchical_forecast(df, customers=None, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, store=None,
+                          incremental=False, segments=None, reconcile=False):
+    tree = Hierarchy(df, customers, segments)
+    nodes = forecast_tiers(tree.nodes, max_workers, min_points, store, incremental)
+    bottom = baseline_forecasts(tree.pairs, min_points)["Forecast"] if reconcile else None
+    frame = pd.DataFrame(list(tree.pairs), columns=KEYS)
+    frame["Forecast"] = tree.disaggregate(nodes["Forecast"], bottom)
+    frame["Method"] = ("Reconciled " if reconcile else "Top-Down ") + nodes["Method"].to_numpy(dtype=object)[tree.node]
+    frame["Points"] = [len(ts) for ts in tree.pairs.values()]
+    frame["Tier"] = nodes["Tier"].to_numpy()[tree.node]
+    if "Fit" in nodes:
+        frame["Fit"] = nodes["Fit"].to_numpy()[tree.node]
+    return frame[COLUMNS + ["Tier"] + (["Fit"] if "Fit" in nodes else [])]
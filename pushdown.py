@@ -0,0 +1,120 @@
+import os
+
+import pandas as pd
+from sqlalchemy import DateTime, bindparam, inspect, text
+
+from data_loader import quote, tidy
+from next_purchase import average_intervals
+
+AGGREGATE_MODE = os.environ.get("AGGREGATE_MODE", "pandas")
+
+# First day of the month of a date column, per dialect.
+MONTH_START = {
+    "sqlite": "strftime('%Y-%m-01', {column})",
+    "postgresql": "date_trunc('month', {column})",
+}
+
+
+def supports(conn):
+    return conn.dialect.name in MONTH_START
+
+
+# numpy scalars are not valid bind parameters for every driver
+def _param(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+# -------------------------------
+# SQL AGGREGATES
+# -------------------------------
+# The dashboard aggregates as GROUP BY queries, so only the grouped rows
+# leave the database. Same methods and result columns as the pandas side
+# (SharedData): product totals, one product's monthly totals, and one
+# customer's purchase counts and product x month heatmap. The customer's
+# purchase intervals and a product's rows in a date range are plain
+# filtered SELECTs - still only the rows asked for. dated_only leaves out
+# rows without a Date, for apps that drop them from the shared frame.
+class SqlAggregates:
+    def __init__(self, conn, table, dated_only=False):
+        if not supports(conn):
+            raise ValueError(f"no month truncation for the {conn.dialect.name} dialect")
+        self.conn = conn
+        self.table = quote(conn, table)
+        # column names in the table carry stray whitespace
+        self.columns = {column["name"].strip(): quote(conn, column["name"]) for column in inspect(conn).get_columns(table)}
+        self.month = MONTH_START[conn.dialect.name].format(column=self.columns["Date"])
+        self.dated_only = dated_only
+
+    def _where(self, where):
+        return f"{where} AND {self.columns['Date']} IS NOT NULL" if self.dated_only else where
+
+    def _query(self, select, where, group_by, **params):
+        query = f"SELECT {select} FROM {self.table} WHERE {self._where(where)} GROUP BY {group_by} ORDER BY {group_by}"
+        return pd.read_sql(text(query), self.conn, params={key: _param(value) for key, value in params.items()})
+
+    # Rows of the given columns, tidied like the loader's; date bounds are
+    # bound as DateTime so they compare like the column on every dialect.
+    def _rows(self, columns, where, order_by=None, limit=None, **params):
+        select = ", ".join(f'{self.columns[column]} AS "{column}"' for column in columns)
+        query = f"SELECT {select} FROM {self.table} WHERE {self._where(where)}"
+        if order_by is not None:
+            query += f" ORDER BY {order_by}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        dates = [bindparam(key, type_=DateTime()) for key, value in params.items() if isinstance(value, pd.Timestamp)]
+        params = {key: value.to_pydatetime() if isinstance(value, pd.Timestamp) else _param(value)
+                  for key, value in params.items()}
+        return tidy(pd.read_sql(text(query).bindparams(*dates), self.conn, params=params))
+
+    # Row count, latest Date and total quantity, in one scan the database
+    # does: changes when rows are added or removed and with most edits.
+    def signature(self):
+        date, quantity = self.columns["Date"], self.columns["Quantity"]
+        query = f"SELECT COUNT(*), MAX({date}), SUM({quantity}) FROM {self.table}"
+        return tuple(pd.read_sql(text(query), self.conn).iloc[0])
+
+    def product_totals(self):
+        product, quantity = self.columns["Product"], self.columns["Quantity"]
+        return self._query(f'{product} AS "Product", SUM({quantity}) AS "Quantity"', f"{product} IS NOT NULL", product)
+
+    def product_monthly(self, product):
+        date, quantity = self.columns["Date"], self.columns["Quantity"]
+        frame = self._query(f'{self.month} AS "Month", SUM({quantity}) AS "Quantity"',
+                            f"{self.columns['Product']} = :product AND {date} IS NOT NULL", self.month,
+                            product=product)
+        frame["Month"] = pd.to_datetime(frame["Month"])
+        return frame
+
+    def customer_frequency(self, customer):
+        product, date = self.columns["Product"], self.columns["Date"]
+        return self._query(f'{product} AS "Product", COUNT({date}) AS "Purchase Count"',
+                           f"{self.columns['Customer ID']} = :customer AND {product} IS NOT NULL", product,
+                           customer=customer)
+
+    def customer_heatmap(self, customer):
+        product, date, quantity = self.columns["Product"], self.columns["Date"], self.columns["Quantity"]
+        frame = self._query(f'{product} AS "Product", {self.month} AS "Month", SUM({quantity}) AS "Quantity"',
+                            f"{self.columns['Customer ID']} = :customer AND {product} IS NOT NULL AND {date} IS NOT NULL",
+                            f"{product}, {self.month}", customer=customer)
+        frame["Month"] = pd.to_datetime(frame["Month"])
+        return frame.pivot_table(index="Product", columns="Month", values="Quantity", aggfunc="sum", fill_value=0)
+
+    # The customer's rows in table order, so products are listed by first
+    # purchase as average_intervals lists them from the loaded rows.
+    def customer_intervals(self, customer, label="Avg Interval (days)"):
+        rows = self._rows(["Customer ID", "Product", "Date"], f"{self.columns['Customer ID']} = :customer",
+                          customer=customer)
+        return average_intervals(rows, label)
+
+    # start and end are whole days, both included; rows without a Date are
+    # left out, as TimeIndex leaves them out.
+    def product_rows(self, product, start=None, end=None, limit=None):
+        date = self.columns["Date"]
+        where, params = [f"{self.columns['Product']} = :product", f"{date} IS NOT NULL"], {"product": product}
+        if start is not None:
+            where.append(f"{date} >= :start")
+            params["start"] = pd.Timestamp(start)
+        if end is not None:
+            where.append(f"{date} < :stop")
+            params["stop"] = pd.Timestamp(end) + pd.Timedelta(days=1)
+        return self._rows(["Customer ID", "Product", "Date", "Quantity"], " AND ".join(where), date, limit, **params)
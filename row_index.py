@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+
+# -------------------------------
+# ROW INDEX
+# -------------------------------
+# Row positions of every customer and product, built once per data load, so
+# selecting one customer or product costs O(rows selected) instead of a
+# comparison over the whole column.
+class RowIndex:
+    def __init__(self, df, columns=("Customer ID", "Product")):
+        self.frame = df
+        self._positions = {
+            column: df.groupby(column, observed=True, sort=False).indices for column in columns
+        }
+
+    def rows(self, column, value):
+        positions = self._positions[column].get(value)
+        if positions is None:
+            return self.frame.iloc[:0]
+        return self.frame.iloc[positions]
+
+    def customer(self, cust_id):
+        return self.rows("Customer ID", cust_id)
+
+
+# -------------------------------
+# TIME INDEX
+# -------------------------------
+# Row positions ordered by product and then Date (stable, so same-day rows
+# keep their order, and missing dates last), with the dates in that order
+# and the bounds of each product's block. A date range of one product is two
+# binary searches and one take of the rows in it; the frame itself is not
+# copied or reordered.
+class TimeIndex:
+    def __init__(self, df, column="Product"):
+        self.frame = df
+        codes, products = pd.factorize(df[column])
+        dates = df["Date"].to_numpy()
+        key = np.where(np.isnat(dates), np.iinfo(np.int64).max, dates.view("int64"))
+        self._positions = np.lexsort((key, codes))
+        self._dates = dates[self._positions]
+        sorted_codes = codes[self._positions]
+        blocks = np.arange(len(products))
+        starts = sorted_codes.searchsorted(blocks, side="left")
+        stops = sorted_codes.searchsorted(blocks, side="right")
+        self._bounds = dict(zip(products, zip(starts, stops)))
+
+    # start and end are whole days, both included, like comparing .dt.date.
+    def product(self, product, start=None, end=None):
+        first, stop = self._bounds.get(product, (0, 0))
+        dates = self._dates[first:stop]
+        lo = 0 if start is None else dates.searchsorted(np.datetime64(pd.Timestamp(start)), side="left")
+        # NaT sorts last, so an open end stops at the first missing date
+        end = np.datetime64("NaT") if end is None else np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1))
+        hi = dates.searchsorted(end, side="left")
+        return self.frame.iloc[self._positions[first + lo:first + hi]]
@@ -0,0 +1,49 @@
+import pandas as pd
+
+CATEGORY_COLUMNS = ["Customer ID", "Product", "Weather_Season", "Festival_Season"]
+
+
+# -------------------------------
+# COMPACT DTYPES
+# -------------------------------
+# Applied at load time: ids, products and season labels as categoricals,
+# Date as datetime64 and Quantity downcast. Only the converted columns are
+# new; every other column is shared with the input frame.
+def smallest_number(values):
+    numeric = pd.to_numeric(values, errors="coerce")
+    # only whole, non-missing quantities can be stored as integers
+    if numeric.notna().all() and (numeric % 1 == 0).all():
+        return pd.to_numeric(numeric.astype("int64"), downcast="integer")
+    return numeric
+
+
+def compact_dtypes(df):
+    out = df.copy(deep=False)
+    for column in CATEGORY_COLUMNS:
+        if column in out and not isinstance(out[column].dtype, pd.CategoricalDtype):
+            out[column] = out[column].astype("category")
+    if "Date" in out:
+        out["Date"] = pd.to_datetime(out["Date"], errors="coerce")
+    if "Quantity" in out:
+        out["Quantity"] = smallest_number(out["Quantity"])
+    return out
+
+
+# Appending keeps the categoricals: new labels are added to the categories of
+# both sides first, otherwise concat would fall back to object columns.
+def append_rows(frame, rows):
+    frame, rows = frame.copy(deep=False), compact_dtypes(rows)
+    for column in CATEGORY_COLUMNS:
+        if column in frame and column in rows:
+            added = rows[column].cat.categories.difference(frame[column].cat.categories)
+            frame[column] = frame[column].cat.add_categories(added)
+            rows[column] = rows[column].cat.set_categories(frame[column].cat.categories)
+    return pd.concat([frame, rows], ignore_index=True)
+
+
+# Aggregates of a categorical column still carry every category, which makes
+# tables and seaborn axes list products that are not in the result. Small
+# aggregate frames go back to plain columns before they are shown.
+def as_plain(frame):
+    categorical = [c for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)]
+    return frame.astype({c: frame[c].cat.categories.dtype for c in categorical})
@@ -0,0 +1,50 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+WEATHER_BY_MONTH = {
+    12: "Winter", 1: "Winter", 2: "Winter",
+    3: "Summer", 4: "Summer", 5: "Summer",
+    6: "Monsoon", 7: "Monsoon", 8: "Monsoon",
+}
+# (festival, month, first day, last day)
+FESTIVAL_WINDOWS = [
+    ("New Year", 1, 1, 15),
+    ("Holi", 3, 1, 20),
+    ("Eid", 4, 1, 25),
+    ("Independence Day", 8, 1, 30),
+    ("Dussehra", 10, 1, 15),
+    ("Diwali", 2, 1, 15),
+    ("Christmas", 12, 1, 25),
+]
+WEATHER_SEASONS = sorted(["Winter", "Summer", "Monsoon", "Autumn"])
+FESTIVAL_SEASONS = sorted([name for name, *_ in FESTIVAL_WINDOWS] + ["None"])
+
+
+# -------------------------------
+# SEASON CALENDAR
+# -------------------------------
+# One slot per (month, day) - month * 32 + day - so leap years need no special
+# case. Slot 0 is where missing dates land and, like the old if/elif chains,
+# they come out as "Autumn" / "None".
+@lru_cache(maxsize=None)
+def season_calendar(independence_day_end=30):
+    weather = np.full(13 * 32, WEATHER_SEASONS.index("Autumn"), dtype=np.int8)
+    festival = np.full(13 * 32, FESTIVAL_SEASONS.index("None"), dtype=np.int8)
+    for month, season in WEATHER_BY_MONTH.items():
+        weather[month * 32:(month + 1) * 32] = WEATHER_SEASONS.index(season)
+    for name, month, first, last in FESTIVAL_WINDOWS:
+        if name == "Independence Day":
+            last = independence_day_end
+        festival[month * 32 + first:month * 32 + last + 1] = FESTIVAL_SEASONS.index(name)
+    return weather, festival
+
+
+def tag_seasons(dates, independence_day_end=30):
+    weather, festival = season_calendar(independence_day_end)
+    slot = (dates.dt.month * 32 + dates.dt.day).fillna(0).to_numpy(dtype=np.int64)
+    return (
+        pd.Series(pd.Categorical.from_codes(weather[slot], WEATHER_SEASONS), index=dates.index),
+        pd.Series(pd.Categorical.from_codes(festival[slot], FESTIVAL_SEASONS), index=dates.index),
+    )
@@ -0,0 +1,171 @@
+import glob
+import hashlib
+import os
+import threading
+from contextlib import nullcontext
+
+import pandas as pd
+import pyarrow as pa
+
+from aggregates import AggregateCube, monthly_heatmap, purchase_counts, totals
+from next_purchase import average_intervals, purchase_gap_stats
+from row_index import RowIndex, TimeIndex
+from schema import as_plain, compact_dtypes
+from seasons import tag_seasons
+from snapshot import SNAPSHOT_DIR
+
+
+# -------------------------------
+# MAPPED ARROW FILES
+# -------------------------------
+# Uncompressed Arrow IPC, read back through a memory map with split_blocks:
+# every column of the resulting frame points straight into the mapped file,
+# so the pages are the OS page cache's and are shared by every process that
+# maps the same file. Arrow buffers are immutable, which makes the columns
+# read-only as well - an in-place write raises instead of changing the data
+# under other sessions.
+def shared_path(name, key):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.{key}.arrow")
+
+
+def write_arrow(df, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(partial, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(partial, path)
+
+
+def map_arrow(path):
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+# Short stable key of the source rows, and of the options that derive the
+# shared frame from them: processes holding the same data agree on the file
+# name without coordinating.
+def content_key(df):
+    digest = int(pd.util.hash_pandas_object(df, index=False).sum())
+    return hashlib.sha1(f"{len(df)} {digest}".encode()).hexdigest()[:16]
+
+
+def options_key(options):
+    return hashlib.sha1(repr(options).encode()).hexdigest()[:8]
+
+
+# -------------------------------
+# SHARED DATA
+# -------------------------------
+# The loaded table (season-tagged when seasons is given) and what the
+# dashboards derive from it, built once per data version and shared by every
+# session: the apps hold it with st.cache_resource, which hands out the
+# object itself rather than a copy. Sessions read views of it - cube slices,
+# row-index lookups - and never modify it; small aggregates they want to
+# change are copied first. The aggregate methods at the end are the pandas
+# side of pushdown.SqlAggregates; streaming.StreamedData serves the same
+# interface without the rows in memory. stage, when given, is called as
+# stage(name, rows=...) for a context manager timing the season tagging
+# (diagnostics.substage in the apps).
+class SharedData:
+    def __init__(self, frame, name, seasons=None, stage=None):
+        self.name = name
+        self.seasons = seasons
+        self.frame = self._share(frame, seasons, stage)
+        self._lock = threading.Lock()
+        self._derived = {}
+
+    def _share(self, frame, seasons, stage):
+        prefix = f"{self.name}.{options_key(seasons)}"
+        path = shared_path(prefix, content_key(frame))
+        try:
+            return map_arrow(path)
+        except FileNotFoundError:
+            pass
+        frame = frame.copy(deep=False)
+        if seasons is not None:
+            with nullcontext() if stage is None else stage("season_tagging", rows=len(frame)):
+                frame["Weather_Season"], frame["Festival_Season"] = tag_seasons(frame["Date"], **seasons)
+        write_arrow(compact_dtypes(frame), path)
+        # removing a mapped file leaves it valid for the processes mapping it
+        for old in glob.glob(shared_path(prefix, "*")):
+            if old != path:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+        return map_arrow(path)
+
+    # Built by the first session that asks, under the lock so concurrent
+    # sessions don't build the same thing twice.
+    def _once(self, key, build):
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build()
+            return self._derived[key]
+
+    @property
+    def rows(self):
+        return len(self.frame)
+
+    # the rows monthly_series, Hierarchy and the baselines are built from
+    @property
+    def sales(self):
+        return self.frame
+
+    def customers(self):
+        return self.frame["Customer ID"].dropna().unique()
+
+    def products(self):
+        return self.frame["Product"].dropna().unique()
+
+    def date_range(self):
+        return self.frame["Date"].min(), self.frame["Date"].max()
+
+    def gap_stats(self):
+        return self._once("gap_stats", lambda: purchase_gap_stats(self.frame))
+
+    def product_rows(self, product, start=None, end=None, limit=None):
+        rows = self.time_index.product(product, start, end)
+        return rows if limit is None else rows.head(limit)
+
+    # customer lookups; a product's rows come from time_index
+    @property
+    def index(self):
+        return self._once("index", lambda: RowIndex(self.frame, columns=("Customer ID",)))
+
+    @property
+    def time_index(self):
+        return self._once("time_index", lambda: TimeIndex(self.frame))
+
+    @property
+    def cube(self):
+        return self._once("cube", lambda: AggregateCube(self.frame))
+
+    # Every product's monthly totals from one groupby over the rows, for
+    # frames without seasons - and so without a cube to read them from.
+    @property
+    def monthly(self):
+        def build():
+            month = self.frame["Date"].dt.to_period("M").dt.to_timestamp().rename("Month")
+            return as_plain(self.frame.groupby(["Product", month], observed=True)["Quantity"].sum().reset_index())
+        return self._once("monthly", build)
+
+    def product_totals(self):
+        return self._once("product_totals", lambda: totals(self.frame, "Product")).copy()
+
+    # A slice of the cube when there is one, as StreamedData reads it.
+    def product_monthly(self, product):
+        if self.seasons is not None:
+            return self.cube.monthly(product)
+        monthly = self.monthly
+        return monthly.loc[monthly["Product"] == product, ["Month", "Quantity"]].reset_index(drop=True)
+
+    def customer_frequency(self, customer):
+        return purchase_counts(self.index.customer(customer))
+
+    def customer_heatmap(self, customer):
+        return monthly_heatmap(self.index.customer(customer))
+
+    def customer_intervals(self, customer, label="Avg Interval (days)"):
+        return average_intervals(self.index.customer(customer), label)
@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from schema import compact_dtypes
+
+SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR", "snapshots")
+REFRESH_SECONDS = int(os.environ.get("SNAPSHOT_REFRESH_SECONDS", "600"))
+
+
+def snapshot_path(table):
+    return os.path.join(SNAPSHOT_DIR, f"{table}.parquet")
+
+
+# -------------------------------
+# COLUMNAR SNAPSHOT
+# -------------------------------
+# Parquet with zstd: ids and products as dictionary (categorical) columns,
+# Date as datetime64 and Quantity in the smallest integer type that holds it.
+def write_snapshot(df, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(compact_dtypes(df), preserve_index=False)
+    # write beside the target and rename, so readers never see a partial file
+    partial = f"{path}.{os.getpid()}.tmp"
+    pq.write_table(table, partial, compression="zstd")
+    os.replace(partial, path)
+
+
+def read_snapshot(path):
+    return pq.read_table(path, memory_map=True).to_pandas()
+
+
+# Serves the snapshot on disk straight away and refreshes it from the database
+# on a background thread. version changes whenever a refresh brought new rows,
+# so callers can key their caches on it.
+class SnapshotRefresher:
+    def __init__(self, loader, path, interval=REFRESH_SECONDS):
+        self.loader = loader
+        self.path = path
+        self.interval = interval
+        self.version = 0
+        self.error = None
+        self._source = None
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self.frame = read_snapshot(path)
+            refresh_now = True
+        else:
+            self.frame = None
+            self.refresh()
+            refresh_now = False
+        threading.Thread(target=self._run, args=(refresh_now,), daemon=True).start()
+
+    def refresh(self, full=False):
+        with self._lock:
+            source = self.loader.load(full=full)
+            if source is self._source:
+                return self.frame
+            frame = compact_dtypes(source)
+            write_snapshot(frame, self.path)
+            self._source, self.frame = source, frame
+            self.version += 1
+            return frame
+
+    def _run(self, refresh_now):
+        while True:
+            if not refresh_now:
+                time.sleep(self.interval)
+            refresh_now = False
+            try:
+                self.refresh()
+                self.error = None
+            except Exception as exc:
+                self.error = exc
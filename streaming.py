@@ -0,0 +1,258 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AggregateCube
+from data_loader import CHUNK_ROWS, read_chunks
+from next_purchase import DAY_NS
+from pushdown import SqlAggregates
+from row_index import RowIndex
+from schema import CATEGORY_COLUMNS, as_plain
+from seasons import tag_seasons
+from snapshot import REFRESH_SECONDS
+
+CUBE_KEYS = ["Product", "Date", "Weather_Season", "Festival_Season"]
+
+
+# Keys come back as categoricals like compact_dtypes makes them; sums keep the
+# dtype they were added up in.
+def categorical(frame):
+    return frame.astype({column: "category" for column in CATEGORY_COLUMNS if column in frame})
+
+
+# Partial aggregates are combined by summing (or min/max-ing) rows with the
+# same key. Parts are merged once they add up to as many rows as what is
+# already merged, so every row is re-aggregated O(log chunks) times.
+class _Accumulator:
+    def __init__(self, how):
+        self.how = how
+        self.merged = None
+        self.parts = []
+        self.pending = 0
+
+    def add(self, part):
+        self.parts.append(part)
+        self.pending += len(part)
+        if self.merged is None or self.pending >= len(self.merged):
+            self.merge()
+
+    def merge(self):
+        if self.parts:
+            frame = pd.concat(([] if self.merged is None else [self.merged]) + self.parts)
+            self.merged = frame.groupby(level=list(range(frame.index.nlevels)), observed=True, sort=False).agg(self.how)
+            self.parts, self.pending = [], 0
+        return self.merged
+
+
+# Labels seen so far, numbered in order of first appearance; chunks are keyed
+# on these integer codes so the running aggregates hold no strings.
+class _Labels:
+    def __init__(self):
+        self.index = pd.Index([])
+
+    def codes(self, column):
+        categories = column.cat.categories
+        self.index = self.index.append(categories[~categories.isin(self.index)])
+        return np.append(self.index.get_indexer(categories), -1)[column.cat.codes.to_numpy()]
+
+
+# -------------------------------
+# STREAMING AGGREGATES
+# -------------------------------
+# Everything the dashboards and the batch forecast read, accumulated chunk by
+# chunk so the raw table is never held whole:
+#   cube       - quantity per product, day, weather season and festival
+#   totals     - quantity per product
+#   monthly    - quantity and purchases per customer, product and month
+#   pairs      - purchases, first and last date and first row per pair
+# Row order is tracked through each pair's first row, so pairs come out in
+# the same order as pair_groups lists them: customers by first appearance,
+# then each customer's products by first purchase.
+class StreamingAggregates:
+    def __init__(self, seasons=None):
+        self.seasons = seasons or {}
+        self.rows = 0
+        self._customers = _Labels()
+        self._products = _Labels()
+        self._cube = _Accumulator("sum")
+        self._totals = _Accumulator("sum")
+        self._monthly = _Accumulator("sum")
+        self._pairs = _Accumulator({"First Row": "min", "Purchases": "sum", "First": "min", "Last": "max"})
+
+    def add(self, chunk):
+        chunk = chunk.copy(deep=False)
+        chunk["Weather_Season"], chunk["Festival_Season"] = tag_seasons(chunk["Date"], **self.seasons)
+        day = chunk["Date"].dt.normalize()
+        self._cube.add(chunk.groupby(CUBE_KEYS[:1] + [day] + CUBE_KEYS[2:], observed=True)["Quantity"].sum())
+        # rows without a Date are not in the cube but count towards the totals
+        self._totals.add(chunk.groupby("Product", observed=True)["Quantity"].sum())
+
+        valid = (chunk["Date"].notna() & chunk["Customer ID"].notna() & chunk["Product"].notna()).to_numpy()
+        dates = chunk["Date"].to_numpy()[valid]
+        data = pd.DataFrame({
+            "Customer": self._customers.codes(chunk["Customer ID"])[valid],
+            "Product": self._products.codes(chunk["Product"])[valid],
+            "Month": dates.astype("datetime64[M]").astype("int64"),
+            "Quantity": chunk["Quantity"].to_numpy()[valid],
+            "Date": dates,
+            "First Row": self.rows + np.flatnonzero(valid),
+        })
+        self._monthly.add(data.groupby(["Customer", "Product", "Month"], sort=False)["Quantity"].agg(
+            Quantity="sum", Purchases="size"))
+        self._pairs.add(data.groupby(["Customer", "Product"], sort=False).agg(
+            **{"First Row": ("First Row", "min"), "Purchases": ("Date", "size"), "First": ("Date", "min"),
+               "Last": ("Date", "max")}
+        ))
+        self.rows += len(chunk)
+
+    # Pairs in pair_groups order, as a rank per (customer, product) code.
+    def _pair_order(self):
+        first_row = self._pairs.merge()["First Row"]
+        customer_first = first_row.groupby(level="Customer", sort=False).transform("min")
+        order = np.lexsort((first_row.to_numpy(), customer_first.to_numpy()))
+        return pd.Series(np.arange(len(order)), index=first_row.index[order])
+
+    def _labels(self, codes):
+        return categorical(pd.DataFrame({
+            "Customer ID": self._customers.index[codes.get_level_values("Customer")],
+            "Product": self._products.index[codes.get_level_values("Product")],
+        }))
+
+    def cube(self):
+        return AggregateCube(categorical(self._cube.merge().reset_index()))
+
+    def product_totals(self):
+        return as_plain(self._totals.merge().sort_index().reset_index())
+
+    # One row per customer, product and month with Date on the first of the
+    # month: monthly_series, batch_forecast and tiered_forecast give the same
+    # results on this frame as on the raw rows.
+    def monthly(self):
+        merged = self._monthly.merge()
+        rank = self._pair_order().reindex(merged.index.droplevel("Month")).to_numpy()
+        month = merged.index.get_level_values("Month").to_numpy()
+        order = np.lexsort((month, rank))
+        merged = merged.iloc[order]
+        monthly = self._labels(merged.index)
+        monthly["Date"] = month[order].astype("datetime64[M]").astype("datetime64[ns]")
+        monthly["Quantity"] = merged["Quantity"].to_numpy()
+        monthly["Purchases"] = merged["Purchases"].to_numpy()
+        return monthly
+
+    # Same columns and order as purchase_gap_stats. The sorted gaps between a
+    # pair's purchases add up to last - first, so only those two dates are
+    # kept (Date is a calendar date, so whole-day gaps lose nothing).
+    def gap_stats(self):
+        pairs = self._pairs.merge().loc[self._pair_order().index]
+        counts = pairs["Purchases"].to_numpy()
+        span = (pairs["Last"] - pairs["First"]).to_numpy().view("int64") // DAY_NS
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_gap = np.where(counts > 1, span / (counts - 1), np.nan)
+        stats = self._labels(pairs.index)
+        stats["Purchases"] = counts
+        stats["Avg Gap (days)"] = avg_gap
+        stats["Last Purchase"] = pairs["Last"].to_numpy()
+        stats["Next Purchase"] = stats["Last Purchase"] + pd.to_timedelta(avg_gap, unit="D")
+        return stats
+
+
+def stream_table(conn, table, chunksize=CHUNK_ROWS, seasons=None):
+    aggregates = StreamingAggregates(seasons)
+    for chunk in read_chunks(conn, table, chunksize):
+        aggregates.add(chunk)
+    return aggregates
+
+
+# -------------------------------
+# STREAMED DASHBOARD DATA
+# -------------------------------
+# What the dashboards read from SharedData, without the raw table in memory.
+# The cube, product totals, monthly frame and next-purchase stats come from
+# one streamed pass. Per-customer views and product row listings are
+# SqlAggregates queries for just the rows they show. sales is the monthly
+# frame: monthly_series, Hierarchy and the baselines give the same results
+# on it as on the rows, and index looks customers up in it.
+class StreamedData:
+    def __init__(self, conn, table, seasons=None, dated_only=False, chunksize=CHUNK_ROWS):
+        self.seasons = seasons or {}
+        self.sql = SqlAggregates(conn, table, dated_only=dated_only)
+        aggregates = stream_table(conn, table, chunksize, seasons)
+        self.rows = aggregates.rows
+        self.cube = aggregates.cube()
+        # the cube has no undated rows, so its totals leave them out too
+        self._totals = self.cube.product_totals() if dated_only else aggregates.product_totals()
+        self.sales = aggregates.monthly()
+        self.index = RowIndex(self.sales, columns=("Customer ID",))
+        self._gap_stats = aggregates.gap_stats()
+
+    def customers(self):
+        return self.sales["Customer ID"].unique()
+
+    def products(self):
+        return self._totals["Product"].to_numpy()
+
+    def date_range(self):
+        return self.cube.frame["Date"].min(), self.cube.frame["Date"].max()
+
+    def gap_stats(self):
+        return self._gap_stats
+
+    def product_rows(self, product, start=None, end=None, limit=None):
+        rows = self.sql.product_rows(product, start, end, limit)
+        rows["Weather_Season"], rows["Festival_Season"] = tag_seasons(rows["Date"], **self.seasons)
+        return rows
+
+    def product_totals(self):
+        return self._totals.copy()
+
+    def product_monthly(self, product):
+        return self.cube.monthly(product)
+
+    def customer_frequency(self, customer):
+        return self.sql.customer_frequency(customer)
+
+    def customer_heatmap(self, customer):
+        return self.sql.customer_heatmap(customer)
+
+    def customer_intervals(self, customer, label="Avg Interval (days)"):
+        return self.sql.customer_intervals(customer, label)
+
+
+# Serves StreamedData for a table and rebuilds it on a background thread
+# every interval - only when the table's signature changed, since a rebuild
+# streams the whole table again. version changes with every rebuild, so
+# callers can key their caches on it as on SnapshotRefresher's.
+class StreamRefresher:
+    def __init__(self, conn, table, interval=REFRESH_SECONDS, **options):
+        self.conn = conn
+        self.table = table
+        self.interval = interval
+        self.options = options
+        self.version = 0
+        self.error = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self.data = None
+        self.refresh()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def refresh(self, full=False):
+        with self._lock:
+            signature = SqlAggregates(self.conn, self.table).signature()
+            if signature == self._signature and not full:
+                return self.data
+            self.data = StreamedData(self.conn, self.table, **self.options)
+            self._signature = signature
+            self.version += 1
+            return self.data
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+                self.error = None
+            except Exception as exc:
+                self.error = exc
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from baselines import ALPHAS, SEASON, exp_smoothing, fit_alpha, mean_forecast, right_aligned, seasonal_naive
+
+
+def as_series(*values):
+    return {(f"C{i}", "P"): pd.Series(v, dtype="float64") for i, v in enumerate(values)}
+
+
+# Straightforward versions to check the array expressions against.
+def recursive_smoothing(values, alpha):
+    level = values[0]
+    for x in values[1:]:
+        level = alpha * x + (1 - alpha) * level
+    return level
+
+
+def recursive_sse(values, alpha):
+    level, sse = values[0], 0.0
+    for x in values[1:]:
+        sse += (x - level) ** 2
+        level += alpha * (x - level)
+    return sse
+
+
+@pytest.fixture(scope="module")
+def values():
+    rng = np.random.default_rng(7)
+    return [rng.poisson(20, size=n).astype("float64") for n in (1, 2, 5, 13, 30)]
+
+
+def test_right_aligned(values):
+    matrix = right_aligned(as_series(*values))
+    assert matrix.shape == (len(values), 30)
+    for row, v in zip(matrix, values):
+        np.testing.assert_array_equal(row[-len(v):], v)
+        assert np.isnan(row[:-len(v)]).all()
+
+
+@pytest.mark.parametrize("alpha", [0.05, 0.3, 0.9])
+def test_exp_smoothing_matches_recursion(values, alpha):
+    matrix = right_aligned(as_series(*values))
+    expected = [recursive_smoothing(v, alpha) for v in values]
+    np.testing.assert_allclose(exp_smoothing(matrix, alpha), expected)
+
+
+def test_exp_smoothing_alpha_per_series(values):
+    matrix = right_aligned(as_series(*values))
+    alphas = np.linspace(0.1, 0.9, len(values))
+    expected = [recursive_smoothing(v, a) for v, a in zip(values, alphas)]
+    np.testing.assert_allclose(exp_smoothing(matrix, alphas), expected)
+
+
+def test_fit_alpha_minimizes_one_step_errors(values):
+    matrix = right_aligned(as_series(*values[1:]))
+    expected = [ALPHAS[np.argmin([recursive_sse(v, a) for a in ALPHAS])] for v in values[1:]]
+    np.testing.assert_array_equal(fit_alpha(matrix), expected)
+
+
+def test_single_value():
+    matrix = right_aligned(as_series([7.0]))
+    assert exp_smoothing(matrix)[0] == pytest.approx(7.0)
+    assert exp_smoothing(matrix, fit_alpha(matrix))[0] == pytest.approx(7.0)
+    assert mean_forecast(matrix)[0] == 7.0
+
+
+def test_all_zero():
+    matrix = right_aligned(as_series(np.zeros(15)))
+    assert exp_smoothing(matrix, fit_alpha(matrix))[0] == 0.0
+    assert seasonal_naive(matrix)[0] == 0.0
+    assert mean_forecast(matrix)[0] == 0.0
+
+
+def test_no_series():
+    matrix = right_aligned({})
+    assert exp_smoothing(matrix).shape == fit_alpha(matrix).shape == seasonal_naive(matrix).shape == (0,)
+
+
+def test_seasonal_naive_is_last_year():
+    values = np.arange(1.0, 2 * SEASON + 1)
+    assert seasonal_naive(right_aligned(as_series(values)))[0] == values[-SEASON]
+
+
+# NaN for a series shorter than a season, whether the whole matrix is or
+# only that row
+def test_seasonal_naive_shorter_than_a_season():
+    short = np.arange(1.0, SEASON)
+    assert np.isnan(seasonal_naive(right_aligned(as_series(short)))).all()
+    naive = seasonal_naive(right_aligned(as_series(short, np.arange(1.0, SEASON + 2))))
+    assert np.isnan(naive[0])
+    assert naive[1] == 2.0
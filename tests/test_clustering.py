@@ -0,0 +1,134 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+from baselines import right_aligned
+from batch_forecast import ORDER, SEASONAL_ORDER
+from clustering import SHAPE_MONTHS, cluster_forecast, forecast_clusters, kmeans, nearest_centers, normalize
+
+MONTHS = 36
+SHAPES = {
+    "summer": np.sin(np.arange(MONTHS) * np.pi / 6),
+    "winter": -np.sin(np.arange(MONTHS) * np.pi / 6),
+    "growth": np.linspace(-1, 1, MONTHS),
+}
+
+
+def month_index(months=MONTHS):
+    return pd.date_range("2022-01-31", periods=months, freq="M")
+
+
+# Six series per shape at volumes from 10 to 60, with a little noise.
+@pytest.fixture(scope="module")
+def series():
+    rng = np.random.default_rng(2)
+    return {
+        (f"{name}{i}", "P"): pd.Series(volume * (2 + shape) + rng.normal(0, 0.05 * volume, MONTHS), index=month_index())
+        for name, shape in SHAPES.items() for i, volume in enumerate(range(10, 70, 10))
+    }
+
+
+@pytest.fixture(scope="module")
+def shapes(series):
+    return normalize(right_aligned(series))[2][:, -SHAPE_MONTHS:]
+
+
+def groups(series):
+    return np.array([customer.rstrip("0123456789") for customer, _ in series])
+
+
+# Each cluster is exactly one shape, whatever its number.
+def assert_clusters_are_shapes(labels, names):
+    clusters = {name: set(labels[names == name]) for name in SHAPES}
+    assert all(len(found) == 1 for found in clusters.values()), clusters
+    assert len(set.union(*clusters.values())) == len(SHAPES)
+
+
+def test_normalize():
+    matrix = np.array([[np.nan, 1.0, 3.0], [2.0, 2.0, 2.0]])
+    mean, scale, normalized = normalize(matrix)
+    np.testing.assert_allclose(mean, [2.0, 2.0])
+    np.testing.assert_allclose(scale, [1.0, 1.0])
+    np.testing.assert_allclose(normalized, [[0.0, -1.0, 1.0], [0.0, 0.0, 0.0]])
+
+
+@pytest.mark.parametrize("block", [1, 5, 8192])
+def test_nearest_centers_blockwise(shapes, block):
+    centers = shapes[[0, 7, 13]]
+    labels, distances = nearest_centers(shapes, centers, block=block)
+    squared = ((shapes[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    np.testing.assert_array_equal(labels, squared.argmin(axis=1))
+    np.testing.assert_allclose(distances, squared.min(axis=1), atol=1e-9)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_kmeans_finds_the_shapes(series, shapes, seed):
+    labels, medoids = kmeans(shapes, len(SHAPES), seed=seed)
+    assert_clusters_are_shapes(labels, groups(series))
+    # every medoid belongs to its own cluster
+    assert (labels[medoids] == np.arange(len(SHAPES))).all()
+
+
+def test_kmeans_is_deterministic_per_seed(shapes):
+    first, second = kmeans(shapes, 4, seed=5), kmeans(shapes, 4, seed=5)
+    np.testing.assert_array_equal(first[0], second[0])
+    np.testing.assert_array_equal(first[1], second[1])
+
+
+def test_medoid_is_nearest_member(shapes):
+    labels, medoids = kmeans(shapes, len(SHAPES), seed=0)
+    for cluster, medoid in enumerate(medoids):
+        members = np.flatnonzero(labels == cluster)
+        center = shapes[members].mean(axis=0)
+        assert medoid == members[((shapes[members] - center) ** 2).sum(axis=1).argmin()]
+
+
+# k-means++ never draws a point that is already a center while others are
+# left, so as many distinct points as clusters give one point per cluster.
+def test_seeding_picks_distinct_points():
+    points = np.repeat(np.eye(4), [5, 1, 1, 1], axis=0)
+    for seed in range(10):
+        labels, medoids = kmeans(points, 4, seed=seed)
+        assert sorted(np.bincount(labels)) == [1, 1, 1, 5]
+        assert (medoids >= 0).all()
+
+
+def test_more_clusters_than_series(shapes):
+    labels, medoids = kmeans(shapes[:2], 5)
+    assert len(medoids) == 2
+    assert sorted(labels) == [0, 1]
+
+
+# Members are run through the filter with the medoid's parameters: the
+# medoid itself gets its own fitted forecast.
+def test_cluster_forecast_filters_members(series):
+    medoid, other = series[("summer0", "P")], series[("summer3", "P")]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fitted = SARIMAX(medoid, order=ORDER, seasonal_order=SEASONAL_ORDER).fit(disp=False)
+        results = cluster_forecast(medoid, [medoid, other, pd.Series(["not", "numbers"])])
+    expected = SARIMAX(other, order=ORDER, seasonal_order=SEASONAL_ORDER).filter(fitted.params).forecast(1).iloc[0]
+    assert results[0] == (pytest.approx(fitted.forecast(1).iloc[0]), "Cluster SARIMA")
+    assert results[1] == (pytest.approx(expected), "Cluster SARIMA")
+    assert results[2] == (0.0, "Avg")
+
+
+def test_cluster_forecast_without_a_fit(series):
+    assert cluster_forecast(pd.Series(["not", "numbers"]), [series[("summer0", "P")]] * 2) == [(0.0, "Avg")] * 2
+
+
+def test_forecast_clusters(series):
+    short = {("short", "P"): pd.Series([4.0, 6.0], index=month_index(2))}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        frame = forecast_clusters({**series, **short}, len(SHAPES), max_workers=1, seed=0)
+    clustered = frame.iloc[:len(series)]
+    assert_clusters_are_shapes(clustered["Cluster"].to_numpy(), groups(series))
+    assert (clustered["Method"] == "Cluster SARIMA").all()
+    assert frame.iloc[-1][["Forecast", "Method", "Cluster"]].tolist() == [5.0, "Est Avg", -1]
+    # forecasts come back in each series' own volume
+    last = np.array([ts.iloc[-1] for ts in series.values()])
+    assert (np.abs(clustered["Forecast"].to_numpy() - last) < 0.5 * last).all()
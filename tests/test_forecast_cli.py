@@ -0,0 +1,47 @@
+import pytest
+from sqlalchemy import create_engine
+
+from forecast_cli import main, read_results
+from synthetic import synthetic_sales
+
+
+@pytest.mark.parametrize("argv,message", [
+    (["--clusters", "5", "--hierarchical"], "--clusters cannot be combined with --hierarchical"),
+    (["--clusters", "5", "--sarima-only"], "--clusters cannot be combined with --sarima-only"),
+    (["--clusters", "5", "--store", "other.sqlite"], "--clusters cannot be combined with --store"),
+    (["--clusters", "5", "--full-refit"], "--clusters cannot be combined with --full-refit"),
+    (["--clusters", "0"], "--clusters must be at least 1"),
+    (["--reconcile"], "--reconcile only applies with --hierarchical"),
+    (["--hierarchical", "--sarima-only"], "--sarima-only cannot be combined with --hierarchical"),
+])
+def test_rejected_combinations(argv, message, capsys):
+    with pytest.raises(SystemExit):
+        main(["--db-url", "sqlite://"] + argv)
+    assert message in capsys.readouterr().err
+
+
+# Without --db-url the table's database is resolved as the dashboards do:
+# ramp from $RAMP_DATABASE_URL, final_fooddata from $FOODDATA_DATABASE_URL.
+@pytest.mark.parametrize("table,variable", [("ramp", "RAMP_DATABASE_URL"),
+                                            ("final_fooddata", "FOODDATA_DATABASE_URL")])
+def test_db_url_defaults_to_the_apps_database(table, variable, tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'sales.sqlite'}"
+    engine = create_engine(url)
+    synthetic_sales(500, 5, 3).to_sql(table, engine, index=False)
+    monkeypatch.chdir(tmp_path)
+    for name in ("DATABASE_URL", "RAMP_DATABASE_URL", "FOODDATA_DATABASE_URL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv(variable, url)
+    main(["--table", table, "--no-store", "--workers", "1"])
+    forecasts, next_purchase = read_results(engine, table)
+    assert len(forecasts) == 15 and len(next_purchase) == 15
+    engine.dispose()
+
+
+def test_db_url_required_without_a_configured_database(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    for name in ("DATABASE_URL", "RAMP_DATABASE_URL"):
+        monkeypatch.delenv(name, raising=False)
+    with pytest.raises(SystemExit):
+        main(["--table", "ramp"])
+    assert "no database configured for ramp" in capsys.readouterr().err
@@ -0,0 +1,49 @@
+import glob
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_forecast import forecast_series, process_pool
+from forecast_jobs import ForecastJobs
+
+
+def series(offset):
+    return pd.Series(np.arange(30.0) % 12 + offset, index=pd.date_range("2022-01-31", periods=30, freq="M"))
+
+
+# Streamlit installs the page script as __main__ while it runs; workers must
+# not execute it.
+@pytest.fixture
+def page_as_main(tmp_path, monkeypatch):
+    page = tmp_path / "page.py"
+    page.write_text(f"import os\nopen(os.path.join({str(tmp_path)!r}, f'ran.{{os.getpid()}}'), 'w').close()\n")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(page)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+    return tmp_path
+
+
+def test_workers_do_not_run_main(page_as_main):
+    with process_pool(2) as pool:
+        results = list(pool.map(forecast_series, [series(i) for i in range(4)]))
+    assert [method for _, method in results] == ["SARIMA"] * 4
+    assert glob.glob(os.path.join(page_as_main, "ran.*")) == []
+
+
+def test_results_are_bounded():
+    jobs = ForecastJobs(max_workers=1, max_results=2)
+    fitted = {(f"C{i}", "P"): series(i) for i in range(3)}
+    keys = jobs.submit(fitted)
+    jobs._pool.shutdown(wait=True)
+    assert len(jobs._results) == 2
+    # the evicted series is fitted again when it is asked for
+    evicted = [pair for pair, key in keys.items() if jobs.result(key) is None]
+    assert len(evicted) == 1
+    jobs._pool = process_pool(1)
+    jobs.submit({pair: fitted[pair] for pair in evicted})
+    jobs._pool.shutdown(wait=True)
+    assert jobs.done({pair: keys[pair] for pair in evicted})
@@ -0,0 +1,96 @@
+import math
+
+import pytest
+
+import forecast_store
+from forecast_store import ForecastStore
+
+
+# The store reads the time through time.time; the clock moves only when a
+# test sets it.
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(forecast_store.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ForecastStore(str(tmp_path / "store.sqlite"))
+
+
+def test_round_trip_counts_hits_and_misses(store):
+    store.put_many({"a": (1.5, "SARIMA"), "b": (2.0, "Avg")})
+    assert store.get_many(["a", "b", "c"]) == {"a": (1.5, "SARIMA"), "b": (2.0, "Avg")}
+    assert store.get("c") is None
+    assert (store.hits, store.misses) == (2, 2)
+    assert store.stats() == {"hits": 2, "misses": 2, "entries": 2, "models": 0}
+
+
+def test_nan_forecast_is_read_back_as_nan(store):
+    store.put("a", float("nan"), "Est Avg")
+    value, method = store.get("a")
+    assert math.isnan(value)
+    assert method == "Est Avg"
+    assert store.hits == 1
+
+
+def test_put_replaces(store):
+    store.put("a", 1.0, "Avg")
+    store.put("a", 2.0, "SARIMA")
+    assert store.get("a") == (2.0, "SARIMA")
+    assert store.stats()["entries"] == 1
+
+
+def test_evict_by_age(store, clock):
+    store.put("old", 1.0, "SARIMA")
+    clock[0] += 100
+    store.put("new", 2.0, "SARIMA")
+    clock[0] += 10
+    # reading an entry does not make it younger
+    store.get("old")
+    assert store.evict(max_age=50, max_entries=None, model_age=None) == 1
+    assert store.get_many(["old", "new"]) == {"new": (2.0, "SARIMA")}
+
+
+def test_evict_by_size_keeps_recently_read(store, clock):
+    for key in "abcd":
+        clock[0] += 1
+        store.put(key, 1.0, "SARIMA")
+    clock[0] += 1
+    store.get("a")
+    assert store.evict(max_age=None, max_entries=2, model_age=None) == 2
+    assert set(store.get_many(list("abcd"))) == {"a", "d"}
+
+
+def test_models_round_trip(store):
+    states = {
+        "s1": {"params": [0.1, -0.2, 1.5], "start": "2022-01-31T00:00:00", "n_obs": 30, "history": "h1",
+               "full_fit": 1_700_000_000.0},
+        "s2": {"params": [0.3], "start": "2023-05-31T00:00:00", "n_obs": 12, "history": "h2",
+               "full_fit": 1_700_000_500.0},
+    }
+    store.put_models(states)
+    assert store.get_models(["s1", "s2", "s3"]) == states
+    store.put_models({"s1": dict(states["s1"], n_obs=31)})
+    assert store.get_models(["s1"])["s1"]["n_obs"] == 31
+    assert store.stats()["models"] == 2
+    # model lookups are not forecast lookups
+    assert (store.hits, store.misses) == (0, 0)
+
+
+def test_evict_models_by_full_fit_age(store, clock):
+    state = {"params": [], "start": "2022-01-31T00:00:00", "n_obs": 0, "history": ""}
+    store.put_models({"old": dict(state, full_fit=clock[0] - 100), "new": dict(state, full_fit=clock[0])})
+    store.put("a", 1.0, "SARIMA")
+    assert store.evict(max_age=None, max_entries=None, model_age=50) == 1
+    assert list(store.get_models(["old", "new"])) == ["new"]
+    assert store.stats()["entries"] == 1
+
+
+def test_clear(store):
+    store.put("a", 1.0, "SARIMA")
+    store.put_models({"s": {"full_fit": 0.0}})
+    store.clear()
+    assert store.stats()["entries"] == store.stats()["models"] == 0
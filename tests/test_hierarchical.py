@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from hierarchical import ALL_CUSTOMERS, Hierarchy, hierarchical_forecast
+from synthetic import synthetic_sales
+from tiering import baseline_forecasts, forecast_tiers
+
+
+@pytest.fixture(scope="module")
+def sales():
+    return synthetic_sales(3000, 12, 3, seed=4, seasonality=0.5, sparsity=0.3)
+
+
+@pytest.fixture(scope="module")
+def tree(sales):
+    return Hierarchy(sales)
+
+
+def rows(*purchases):
+    return pd.DataFrame(purchases, columns=["Customer ID", "Product", "Date", "Quantity"]).astype(
+        {"Date": "datetime64[ns]"})
+
+
+def node_sums(tree, values):
+    return np.bincount(tree.node, values, len(tree.nodes))
+
+
+def test_shares_sum_to_one(tree):
+    assert len(tree.pairs) == len(tree.node) == len(tree.shares)
+    assert (tree.shares >= 0).all()
+    np.testing.assert_allclose(node_sums(tree, tree.shares), 1.0)
+
+
+def test_nodes_are_sums_of_their_pairs(tree):
+    nodes = list(tree.nodes)
+    for (segment, product), ts in tree.nodes.items():
+        assert segment == ALL_CUSTOMERS
+        members = [pair_ts for g, pair_ts in zip(tree.node, tree.pairs.values()) if nodes[g] == (segment, product)]
+        total = pd.concat(members, axis=1).sum(axis=1)
+        pd.testing.assert_series_equal(total.reindex(ts.index, fill_value=0), ts, check_names=False,
+                                       check_dtype=False, check_freq=False)
+
+
+# A sells only in the first year, B only in the last months: the recent
+# share is B's alone. For Q nobody bought in the last year, so the shares
+# come from the whole history; R's only purchases have zero quantity, so
+# the split is equal.
+def test_share_fallbacks():
+    tree = Hierarchy(rows(
+        ("A", "P", "2022-01-10", 10), ("A", "P", "2022-03-10", 10), ("B", "P", "2023-06-10", 5),
+        ("B", "P", "2023-07-10", 5), ("A", "Q", "2022-01-10", 3), ("B", "Q", "2022-02-10", 1),
+        ("C", "Q", "2023-07-10", 0), ("A", "R", "2022-01-10", 0), ("B", "R", "2022-02-10", 0),
+    ), share_months=3)
+    shares = dict(zip(tree.pairs, tree.shares))
+    assert shares[("A", "P")] == 0.0 and shares[("B", "P")] == 1.0
+    assert shares[("A", "Q")] == 0.75 and shares[("B", "Q")] == 0.25 and shares[("C", "Q")] == 0.0
+    assert shares[("A", "R")] == shares[("B", "R")] == 0.5
+
+
+def test_segments(sales):
+    segments = {customer: "odd" if int(customer) % 2 else "even" for customer in sales["Customer ID"].unique()}
+    tree = Hierarchy(sales, segments=segments)
+    assert {segment for segment, _ in tree.nodes} == {"odd", "even"}
+    nodes = list(tree.nodes)
+    for (customer, _), g in zip(tree.pairs, tree.node):
+        assert nodes[g][0] == segments[customer]
+    np.testing.assert_allclose(node_sums(tree, tree.shares), 1.0)
+
+
+def test_empty():
+    tree = Hierarchy(rows())
+    assert tree.pairs == tree.nodes == {}
+    assert len(tree.disaggregate([])) == 0
+
+
+# Where every pair's own forecast is zero or missing, the node keeps its
+# historical split.
+def test_disaggregate_with_bottom_falls_back_to_shares(tree):
+    node_forecasts = np.arange(1.0, len(tree.nodes) + 1)
+    bottom = np.where(tree.node == 0, np.nan, 1.0)
+    bottom[tree.node == 1] = 0.0
+    split = tree.disaggregate(node_forecasts, bottom)
+    kept = np.isin(tree.node, [0, 1])
+    np.testing.assert_allclose(split[kept], (tree.shares * node_forecasts[tree.node])[kept])
+    np.testing.assert_allclose(node_sums(tree, split), node_forecasts)
+
+
+@pytest.mark.parametrize("reconcile", [False, True])
+def test_pairs_add_up_to_their_node(sales, tree, reconcile):
+    frame = hierarchical_forecast(sales, max_workers=1, reconcile=reconcile)
+    nodes = forecast_tiers(tree.nodes, max_workers=1)
+    assert list(zip(frame["Customer ID"], frame["Product"])) == list(tree.pairs)
+    np.testing.assert_allclose(node_sums(tree, frame["Forecast"].to_numpy()), nodes["Forecast"])
+    prefix = "Reconciled " if reconcile else "Top-Down "
+    assert (frame["Method"] == prefix + nodes["Method"].to_numpy(dtype=object)[tree.node]).all()
+    assert (frame["Tier"] == nodes["Tier"].to_numpy()[tree.node]).all()
+
+
+# Reconciled, the node's forecast is split in proportion to the pairs'
+# baseline forecasts.
+def test_reconciled_split_follows_baselines(sales, tree):
+    frame = hierarchical_forecast(sales, max_workers=1, reconcile=True)
+    bottom = np.clip(baseline_forecasts(tree.pairs)["Forecast"].to_numpy(), 0, None)
+    node_forecasts = node_sums(tree, frame["Forecast"].to_numpy())
+    expected = bottom / node_sums(tree, bottom)[tree.node] * node_forecasts[tree.node]
+    np.testing.assert_allclose(frame["Forecast"], expected)
+    assert not np.allclose(expected, tree.shares * node_forecasts[tree.node])
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_forecast
+from batch_forecast import MIN_POINTS, ORDER, SEASONAL_ORDER, incremental_forecast, stored_forecasts
+from forecast_store import FULL_REFIT_AGE, ForecastStore, series_id, series_key
+
+NOW = 1_700_000_000.0
+DAY = 86_400
+
+
+def series(months=40, seed=3):
+    rng = np.random.default_rng(seed)
+    values = 20 + 8 * np.sin(np.arange(months) * np.pi / 6) + rng.normal(0, 1, months)
+    return pd.Series(values, index=pd.date_range("2021-01-31", periods=months, freq="M"))
+
+
+# The series fitted from scratch 10 days before NOW, and its stored state.
+@pytest.fixture(scope="module")
+def fitted():
+    ts = series()
+    *_, fit, state = incremental_forecast(ts.iloc[:-1], now=NOW - 10 * DAY)
+    assert fit == "full"
+    return ts, state
+
+
+def test_no_state_is_a_full_fit():
+    ts = series()
+    value, method, fit, state = incremental_forecast(ts, now=NOW)
+    assert (method, fit) == ("SARIMA", "full")
+    assert np.isfinite(value)
+    assert state["full_fit"] == NOW
+    assert state["n_obs"] == len(ts)
+    assert state["start"] == ts.index[0].isoformat()
+    assert state["history"] == series_key(ts)
+
+
+def test_same_series_reuses_the_state(fitted):
+    ts, state = fitted
+    _, _, fit, new_state = incremental_forecast(ts.iloc[:-1], state, now=NOW)
+    assert fit == "filter"
+    assert new_state == state
+
+
+def test_new_month_is_filtered(fitted):
+    ts, state = fitted
+    _, _, fit, new_state = incremental_forecast(ts, state, now=NOW)
+    assert fit == "filter"
+    assert new_state["params"] == state["params"]
+    assert new_state["full_fit"] == state["full_fit"]
+    assert new_state["n_obs"] == len(ts)
+    assert new_state["history"] == series_key(ts)
+
+
+def test_changed_history_is_warm_started(fitted):
+    ts, state = fitted
+    ts = ts.copy()
+    ts.iloc[5] += 4
+    _, _, fit, new_state = incremental_forecast(ts, state, now=NOW)
+    assert fit == "warm"
+    assert new_state["full_fit"] == state["full_fit"]
+    assert new_state["history"] == series_key(ts)
+
+
+def test_drift_is_a_full_fit(fitted):
+    ts, state = fitted
+    ts = ts.copy()
+    ts.iloc[-1] += 100
+    _, _, fit, new_state = incremental_forecast(ts, state, now=NOW)
+    assert fit == "full"
+    assert new_state["full_fit"] == NOW
+    assert new_state["params"] != state["params"]
+
+
+# any error is drift with a zero limit, none is with a huge one
+@pytest.mark.parametrize("jump,limit,expected", [(0, 0.0, "full"), (100, 1e9, "filter")])
+def test_drift_threshold(fitted, monkeypatch, jump, limit, expected):
+    ts, state = fitted
+    ts = ts.copy()
+    ts.iloc[-1] += jump
+    monkeypatch.setattr(batch_forecast, "DRIFT_LIMIT", limit)
+    assert incremental_forecast(ts, state, now=NOW)[2] == expected
+
+
+@pytest.mark.parametrize("change", ["stale", "start", "shorter", "params"])
+def test_unusable_state_is_a_full_fit(fitted, change):
+    ts, state = fitted
+    state = dict(state)
+    if change == "stale":
+        state["full_fit"] = NOW - FULL_REFIT_AGE
+    elif change == "start":
+        ts = ts.iloc[1:]
+    elif change == "shorter":
+        state["n_obs"] = len(ts) + 1
+    else:
+        state["params"] = state["params"][:-1]
+    _, _, fit, new_state = incremental_forecast(ts, state, now=NOW)
+    assert fit == "full"
+    assert new_state["full_fit"] == NOW
+
+
+def test_short_series_has_no_state():
+    ts = series(3)
+    _, method, fit, state = incremental_forecast(ts, now=NOW)
+    assert (method, fit, state) == ("Est Avg", None, None)
+
+
+# Through the store: an unchanged series is read back, an extended one is
+# filtered from the state persisted by the first run.
+def test_store_keeps_states_between_runs(tmp_path):
+    store = ForecastStore(str(tmp_path / "store.sqlite"))
+    ts = series()
+    short = {("C1", "P1"): ts.iloc[:-1]}
+    first, fits = stored_forecasts(short, store, max_workers=1, incremental=True)
+    assert fits == ["full"]
+    assert stored_forecasts(short, store, max_workers=1, incremental=True) == (first, ["cached"])
+    name = series_id(("C1", "P1"), ORDER, SEASONAL_ORDER, MIN_POINTS)
+    assert store.get_models([name])[name]["n_obs"] == len(ts) - 1
+    _, fits = stored_forecasts({("C1", "P1"): ts}, store, max_workers=1, incremental=True)
+    assert fits == ["filter"]
+    assert store.get_models([name])[name]["n_obs"] == len(ts)
+    assert store.stats()["models"] == 1
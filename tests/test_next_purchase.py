@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from bench_next_purchase import loop_next_purchase
+from next_purchase import average_intervals, predict_next_purchase, purchase_gap_stats
+from synthetic import synthetic_sales
+
+
+@pytest.mark.parametrize("n_rows", [1, 50, 5000])
+def test_matches_per_pair_loop(n_rows):
+    df = synthetic_sales(n_rows, 40, 8, seed=n_rows)
+    # same-day repeats and single purchases
+    df = pd.concat([df, df.iloc[:10]], ignore_index=True)
+    expected = loop_next_purchase(df).reset_index(drop=True)
+    assert predict_next_purchase(df).reset_index(drop=True).equals(expected)
+
+
+def test_missing_keys_and_dates_are_skipped():
+    df = synthetic_sales(500, 10, 4)
+    df.loc[::7, "Date"] = pd.NaT
+    clean = df.dropna(subset=["Date"])
+    assert predict_next_purchase(df).equals(loop_next_purchase(clean).reset_index(drop=True))
+
+
+def test_empty_frame():
+    df = synthetic_sales(10, 2, 2).iloc[:0]
+    stats = purchase_gap_stats(df)
+    assert stats.empty
+    assert stats["Last Purchase"].dtype == "datetime64[ns]"
+    assert stats["Next Purchase"].dtype == "datetime64[ns]"
+    assert list(predict_next_purchase(df).columns) == ["Customer ID", "Product", "Next Purchase"]
+    assert list(average_intervals(df).columns) == ["Product", "Avg Interval (days)"]
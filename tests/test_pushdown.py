@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from sqlalchemy import create_engine
+
+import shared_data
+from data_loader import IncrementalLoader
+from pushdown import SqlAggregates
+from schema import as_plain
+from shared_data import SharedData
+from synthetic import synthetic_sales
+
+
+# The same table behind SqlAggregates and SharedData, with and without the
+# rows that have no Date, and with and without seasons (SharedData reads
+# monthly totals from its cube when it has seasons).
+@pytest.fixture(scope="module", params=[(False, None), (True, None), (False, {}), (True, {})],
+                ids=["all_rows", "dated_only", "all_rows_seasons", "dated_only_seasons"])
+def sql_and_shared(request, tmp_path_factory):
+    dated_only, seasons = request.param
+    sales = synthetic_sales(4000, 40, 8, seed=5, sparsity=0.2)
+    sales.loc[::97, "Date"] = pd.NaT
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('db') / 'sales.sqlite'}")
+    sales.to_sql("sales", engine, index=False)
+    with engine.connect() as conn, pytest.MonkeyPatch.context() as patch:
+        patch.setattr(shared_data, "SNAPSHOT_DIR", str(tmp_path_factory.mktemp("snapshots")))
+        frame = IncrementalLoader(conn, "sales").load()
+        if dated_only:
+            frame = frame.dropna(subset=["Date"])
+        yield SqlAggregates(conn, "sales", dated_only=dated_only), SharedData(frame, "sales", seasons=seasons)
+    engine.dispose()
+
+
+CUSTOMERS = ["0", "7", "39", "no such customer"]
+PRODUCTS = ["P0", "P5", "no such product"]
+
+
+def test_product_totals(sql_and_shared):
+    sql, shared = sql_and_shared
+    assert_frame_equal(sql.product_totals(), shared.product_totals(), check_dtype=False)
+
+
+@pytest.mark.parametrize("product", PRODUCTS)
+def test_product_monthly(sql_and_shared, product):
+    sql, shared = sql_and_shared
+    assert_frame_equal(sql.product_monthly(product), shared.product_monthly(product), check_dtype=False)
+
+
+@pytest.mark.parametrize("customer", CUSTOMERS)
+def test_customer_frequency(sql_and_shared, customer):
+    sql, shared = sql_and_shared
+    assert_frame_equal(sql.customer_frequency(customer), shared.customer_frequency(customer), check_dtype=False)
+
+
+@pytest.mark.parametrize("customer", CUSTOMERS)
+def test_customer_heatmap(sql_and_shared, customer):
+    sql, shared = sql_and_shared
+    expected = as_plain(shared.customer_heatmap(customer).reset_index())
+    assert_frame_equal(as_plain(sql.customer_heatmap(customer).reset_index()), expected,
+                       check_dtype=False, check_names=False, check_index_type=False, check_column_type=False)
+
+
+@pytest.mark.parametrize("customer", CUSTOMERS)
+def test_customer_intervals(sql_and_shared, customer):
+    sql, shared = sql_and_shared
+    assert_frame_equal(as_plain(sql.customer_intervals(customer)), as_plain(shared.customer_intervals(customer)),
+                       check_dtype=False)
+
+
+@pytest.mark.parametrize("product", PRODUCTS)
+@pytest.mark.parametrize("start,end,limit", [(None, None, None), ("2022-03-01", "2022-05-31", None),
+                                             ("2024-06-15", None, None), (None, None, 10)])
+def test_product_rows(sql_and_shared, product, start, end, limit):
+    sql, shared = sql_and_shared
+    columns = ["Customer ID", "Product", "Date", "Quantity"]
+    rows = sql.product_rows(product, start, end, limit)
+    expected = shared.product_rows(product, start, end, limit)
+    assert_frame_equal(as_plain(rows[columns]).sort_values(columns, ignore_index=True),
+                       as_plain(expected[columns]).sort_values(columns, ignore_index=True), check_dtype=False)
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from row_index import TimeIndex
+from schema import compact_dtypes
+from synthetic import synthetic_sales
+
+
+@pytest.fixture(scope="module")
+def sales():
+    sales = synthetic_sales(3000, 20, 6, seed=11)
+    sales.loc[::53, "Date"] = pd.NaT
+    sales.loc[::71, "Product"] = None
+    return compact_dtypes(sales)
+
+
+# What the tabs filtered before the index: the product's rows with the date
+# inside the range, both days included, ordered by date.
+def filtered(df, product, start, end):
+    rows = df[df["Product"] == product]
+    if start is not None:
+        rows = rows[rows["Date"].dt.date >= start]
+    if end is not None:
+        rows = rows[rows["Date"].dt.date <= end]
+    return rows[rows["Date"].notna()].sort_values("Date", kind="stable")
+
+
+@pytest.mark.parametrize("product", ["P0", "P3", "no such product"])
+@pytest.mark.parametrize("start,end", [
+    (None, None),
+    (pd.Timestamp("2023-02-01").date(), pd.Timestamp("2023-08-31").date()),
+    (None, pd.Timestamp("2022-06-15").date()),
+    (pd.Timestamp("2024-06-15").date(), None),
+    (pd.Timestamp("2030-01-01").date(), None),
+])
+def test_product_range(sales, product, start, end):
+    assert_frame_equal(TimeIndex(sales).product(product, start, end), filtered(sales, product, start, end))
+
+
+def test_frame_is_not_copied(sales):
+    index = TimeIndex(sales)
+    assert index.frame is sales
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from seasons import tag_seasons
+
+
+# -------------------------------
+# ORIGINAL TAGGING (reference)
+# -------------------------------
+# The if/elif chains the dashboards applied row by row; independence_day_end
+# was 30 in Food_forecast_SARIMA.py and 15 in SARIMA.py.
+def weather_season(month):
+    if month in [12, 1, 2]: return "Winter"
+    elif month in [3, 4, 5]: return "Summer"
+    elif month in [6, 7, 8]: return "Monsoon"
+    else: return "Autumn"
+
+
+def festival_season(date, independence_day_end):
+    m, d = date.month, date.day
+    if (m == 1 and d <= 15): return "New Year"
+    elif (m == 3 and 1 <= d <= 20): return "Holi"
+    elif (m == 4 and 1 <= d <= 25): return "Eid"
+    elif (m == 8 and 1 <= d <= independence_day_end): return "Independence Day"
+    elif (m == 10 and 1 <= d <= 15): return "Dussehra"
+    elif (m == 2 and 1 <= d <= 15): return "Diwali"
+    elif (m == 12 and 1 <= d <= 25): return "Christmas"
+    else: return "None"
+
+
+@pytest.mark.parametrize("independence_day_end", [30, 15])
+def test_matches_if_elif_chains(independence_day_end):
+    # every day of a leap year and the next one, plus a missing date
+    dates = pd.Series(pd.date_range("2024-01-01", "2025-12-31", freq="D").append(pd.DatetimeIndex([pd.NaT])))
+    weather, festival = tag_seasons(dates, independence_day_end=independence_day_end)
+    assert weather.astype(str).tolist() == dates.dt.month.apply(weather_season).tolist()
+    assert festival.astype(str).tolist() == dates.apply(festival_season, args=(independence_day_end,)).tolist()
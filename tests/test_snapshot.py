@@ -0,0 +1,42 @@
+import pandas as pd
+from sqlalchemy import create_engine
+
+from data_loader import IncrementalLoader
+from snapshot import SnapshotRefresher
+from synthetic import synthetic_sales
+
+
+def refresher(tmp_path, sales):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sales.sqlite'}")
+    sales.to_sql("sales", engine, index=False)
+    conn = engine.connect()
+    # a long interval keeps the background thread out of the way
+    return conn, SnapshotRefresher(IncrementalLoader(conn, "sales"), str(tmp_path / "sales.parquet"), interval=3600)
+
+
+def test_refresh_without_new_rows_keeps_version(tmp_path):
+    conn, snapshot = refresher(tmp_path, synthetic_sales(2000, 20, 5))
+    version, frame = snapshot.version, snapshot.frame
+    for _ in range(3):
+        snapshot.refresh()
+    assert snapshot.version == version
+    assert snapshot.frame is frame
+    conn.close()
+
+
+def test_refresh_with_new_rows_bumps_version(tmp_path):
+    sales = synthetic_sales(2000, 20, 5)
+    conn, snapshot = refresher(tmp_path, sales)
+    version = snapshot.version
+    last = sales["Date"].max()
+
+    # a late row on the watermark date, then a row on a later date
+    for date in (last, last + pd.Timedelta(days=1)):
+        row = sales.iloc[:1].assign(Date=date)
+        row.to_sql("sales", conn, if_exists="append", index=False)
+        conn.commit()
+        snapshot.refresh()
+        version += 1
+        assert snapshot.version == version
+    assert len(snapshot.frame) == len(sales) + 2
+    conn.close()
@@ -0,0 +1,121 @@
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from sqlalchemy import create_engine
+
+import shared_data
+from aggregates import AggregateCube
+from batch_forecast import monthly_series
+from data_loader import IncrementalLoader
+from next_purchase import purchase_gap_stats
+from schema import as_plain, compact_dtypes
+from seasons import tag_seasons
+from shared_data import SharedData
+from streaming import StreamedData, stream_table
+from synthetic import synthetic_sales
+
+SEASONS = {"independence_day_end": 15}
+
+
+# The table streamed in small chunks and the same table loaded whole.
+@pytest.fixture(scope="module", params=[997, 100_000])
+def streamed_and_loaded(request, tmp_path_factory):
+    sales = synthetic_sales(5000, 60, 8, seed=3, sparsity=0.3)
+    sales.loc[::211, "Date"] = pd.NaT
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('db') / 'sales.sqlite'}")
+    sales.to_sql("sales", engine, index=False)
+    with engine.connect() as conn:
+        streamed = stream_table(conn, "sales", request.param, SEASONS)
+        df = IncrementalLoader(conn, "sales").load()
+    engine.dispose()
+    return streamed, df
+
+
+def test_rows(streamed_and_loaded):
+    streamed, df = streamed_and_loaded
+    assert streamed.rows == len(df)
+
+
+def test_cube(streamed_and_loaded):
+    streamed, df = streamed_and_loaded
+    seasonal = df.copy(deep=False)
+    seasonal["Weather_Season"], seasonal["Festival_Season"] = tag_seasons(seasonal["Date"], **SEASONS)
+    expected = AggregateCube(compact_dtypes(seasonal)).frame
+    assert_frame_equal(as_plain(streamed.cube().frame), as_plain(expected), check_dtype=False)
+
+
+def test_product_totals(streamed_and_loaded):
+    streamed, df = streamed_and_loaded
+    expected = as_plain(df.groupby("Product", observed=True)["Quantity"].sum().reset_index())
+    assert_frame_equal(streamed.product_totals(), expected, check_dtype=False)
+
+
+def test_monthly_series(streamed_and_loaded):
+    streamed, df = streamed_and_loaded
+    expected = monthly_series(df)
+    series = monthly_series(streamed.monthly())
+    assert list(series) == list(expected)
+    for pair, ts in expected.items():
+        pd.testing.assert_series_equal(series[pair], ts, check_dtype=False)
+
+
+def test_gap_stats(streamed_and_loaded):
+    streamed, df = streamed_and_loaded
+    assert_frame_equal(as_plain(streamed.gap_stats()), as_plain(purchase_gap_stats(df)), check_dtype=False)
+
+
+# StreamedData and SharedData over the same table, with and without the rows
+# that have no Date.
+@pytest.fixture(scope="module", params=[False, True], ids=["all_rows", "dated_only"])
+def streamed_and_shared(request, tmp_path_factory):
+    sales = synthetic_sales(4000, 40, 8, seed=7, sparsity=0.2)
+    sales.loc[::89, "Date"] = pd.NaT
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('db') / 'sales.sqlite'}")
+    sales.to_sql("sales", engine, index=False)
+    with engine.connect() as conn, pytest.MonkeyPatch.context() as patch:
+        patch.setattr(shared_data, "SNAPSHOT_DIR", str(tmp_path_factory.mktemp("snapshots")))
+        frame = IncrementalLoader(conn, "sales").load()
+        if request.param:
+            frame = frame.dropna(subset=["Date"])
+        yield (StreamedData(conn, "sales", SEASONS, dated_only=request.param, chunksize=997),
+               SharedData(frame, "sales", seasons=SEASONS))
+    engine.dispose()
+
+
+def test_streamed_lists(streamed_and_shared):
+    streamed, shared = streamed_and_shared
+    assert sorted(streamed.customers()) == sorted(shared.customers())
+    assert sorted(streamed.products()) == sorted(shared.products())
+    assert [day.date() for day in streamed.date_range()] == [day.date() for day in shared.date_range()]
+
+
+def test_streamed_aggregates(streamed_and_shared):
+    streamed, shared = streamed_and_shared
+    assert_frame_equal(streamed.product_totals(), shared.product_totals(), check_dtype=False)
+    assert_frame_equal(as_plain(streamed.gap_stats()), as_plain(shared.gap_stats()), check_dtype=False)
+    for product in ["P0", "P7", "no such product"]:
+        assert_frame_equal(streamed.product_monthly(product), shared.product_monthly(product), check_dtype=False)
+    for customer in ["3", "21", "no such customer"]:
+        assert_frame_equal(streamed.customer_frequency(customer), shared.customer_frequency(customer),
+                           check_dtype=False)
+        assert_frame_equal(as_plain(streamed.customer_intervals(customer)),
+                           as_plain(shared.customer_intervals(customer)), check_dtype=False)
+
+
+def test_streamed_series(streamed_and_shared):
+    streamed, shared = streamed_and_shared
+    customers = shared.customers()[:5]
+    expected = monthly_series(shared.sales, customers)
+    series = monthly_series(streamed.sales, customers)
+    assert list(series) == list(expected)
+    for pair, ts in expected.items():
+        pd.testing.assert_series_equal(series[pair], ts, check_dtype=False)
+
+
+@pytest.mark.parametrize("start,end", [(None, None), ("2022-03-01", "2022-05-31"), ("2024-06-15", None)])
+def test_streamed_product_rows(streamed_and_shared, start, end):
+    streamed, shared = streamed_and_shared
+    columns = ["Customer ID", "Product", "Date", "Quantity", "Weather_Season", "Festival_Season"]
+    rows = [as_plain(data.product_rows("P2", start, end)[columns]).sort_values(columns[:4], ignore_index=True)
+            for data in (streamed, shared)]
+    assert_frame_equal(*rows, check_dtype=False)
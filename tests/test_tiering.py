@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from baselines import SEASON, exp_smoothing, right_aligned, series_scores
+from batch_forecast import MIN_POINTS
+from tiering import SARIMA_POINTS, baseline_forecasts, choose_tiers
+
+
+def seasonal(months, noise=0.5, seed=0):
+    rng = np.random.default_rng(seed)
+    return 20 + 10 * np.sin(np.arange(months) * 2 * np.pi / SEASON) + rng.normal(0, noise, months)
+
+
+# One series per tier, keyed by the tier it should get.
+@pytest.fixture(scope="module")
+def series():
+    rng = np.random.default_rng(1)
+    intermittent = np.zeros(30)
+    intermittent[::4] = 5.0
+    values = {
+        "short": [3.0, 4.0, 5.0],
+        "intermittent": intermittent,
+        "smooth": 20 + rng.normal(0, 1, 20),
+        "one_year": seasonal(SARIMA_POINTS - 2),
+        "seasonal": seasonal(SARIMA_POINTS + 12),
+    }
+    return {(name, "P"): pd.Series(v, dtype="float64") for name, v in values.items()}
+
+
+EXPECTED = {"short": "Mean", "intermittent": "Mean", "smooth": "Exp Smoothing", "one_year": "Seasonal Naive",
+            "seasonal": "SARIMA"}
+
+
+def test_series_scores(series):
+    scores = series_scores(right_aligned(series))
+    assert scores["Points"].tolist() == [len(ts) for ts in series.values()]
+    assert scores["Sparsity"].tolist()[1] == pytest.approx(22 / 30)
+    # no full season of pairs for the short series
+    assert scores["Seasonality"].tolist()[0] == 0.0
+    assert scores["Seasonality"].tolist()[-1] > 0.5
+
+
+def test_tiers(series):
+    tiers = choose_tiers(series_scores(right_aligned(series)))
+    assert dict(zip((name for name, _ in series), tiers)) == EXPECTED
+
+
+@pytest.mark.parametrize("points,sparsity,seasonality,expected", [
+    (MIN_POINTS - 1, 0.0, 0.9, "Mean"),
+    (MIN_POINTS, 0.0, 0.0, "Exp Smoothing"),
+    (SARIMA_POINTS, 0.6, 0.9, "Mean"),
+    (SEASON, 0.0, 0.9, "Exp Smoothing"),
+    (SEASON + 1, 0.0, 0.3, "Seasonal Naive"),
+    (SARIMA_POINTS - 1, 0.0, 0.9, "Seasonal Naive"),
+    (SARIMA_POINTS, 0.0, 0.49, "Seasonal Naive"),
+    (SARIMA_POINTS, 0.0, 0.5, "SARIMA"),
+])
+def test_tier_boundaries(points, sparsity, seasonality, expected):
+    scores = pd.DataFrame({"Points": [points], "Sparsity": [sparsity], "Seasonality": [seasonality]})
+    assert choose_tiers(scores)[0] == expected
+
+
+def test_min_points():
+    scores = pd.DataFrame({"Points": [3], "Sparsity": [0.0], "Seasonality": [0.0]})
+    assert choose_tiers(scores, min_points=3)[0] == "Exp Smoothing"
+
+
+def test_baseline_forecasts(series):
+    frame = baseline_forecasts(series)
+    by_name = frame.set_index("Customer ID")
+    assert by_name["Tier"].to_dict() == EXPECTED
+    # SARIMA-tier series carry the smoothing value until their fit arrives
+    assert by_name.loc["seasonal", "Method"] == "Exp Smoothing"
+    assert "Est Avg" not in set(frame["Method"])
+    values = {name: ts.to_numpy() for (name, _), ts in series.items()}
+    assert by_name.loc["short", "Forecast"] == pytest.approx(4.0)
+    assert by_name.loc["intermittent", "Forecast"] == pytest.approx(values["intermittent"].mean())
+    assert by_name.loc["one_year", "Forecast"] == values["one_year"][-SEASON]
+    smoothed = exp_smoothing(right_aligned({key: series[key] for key in [("smooth", "P"), ("seasonal", "P")]}))
+    assert by_name.loc[["smooth", "seasonal"], "Forecast"].tolist() == pytest.approx(smoothed.tolist())
+    assert by_name["Points"].tolist() == [len(ts) for ts in series.values()]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from baselines import SEASON, exp_smoothing, mean_forecast, right_aligned, seasonal_naive, series_scores
+from batch_forecast import COLUMNS, DEFAULT_WORKERS, MIN_POINTS, monthly_series, stored_forecasts
+from next_purchase import KEYS
+
+SARIMA_POINTS = 2 * SEASON
+STRONG_SEASONALITY = 0.5
+WEAK_SEASONALITY = 0.3
+MAX_SPARSITY = 0.5
+
+
+# -------------------------------
+# MODEL TIERS
+# -------------------------------
+# Cheapest model that is likely to do as well as SARIMA:
+#   Mean            - too short for anything else, or mostly zero months
+#   Seasonal Naive  - over a year of history with some lag-12 correlation
+#   SARIMA          - two years or more with strong lag-12 correlation
+#   Exp Smoothing   - everything else
+def choose_tiers(scores, min_points=MIN_POINTS):
+    n, sparsity, seasonality = (scores[column].to_numpy() for column in ("Points", "Sparsity", "Seasonality"))
+    tier = np.full(len(scores), "Exp Smoothing", dtype=object)
+    tier[(n > SEASON) & (seasonality >= WEAK_SEASONALITY)] = "Seasonal Naive"
+    tier[(n >= SARIMA_POINTS) & (seasonality >= STRONG_SEASONALITY)] = "SARIMA"
+    tier[(n < min_points) | (sparsity > MAX_SPARSITY)] = "Mean"
+    return tier
+
+
+# Baseline forecast for every series in one pass. SARIMA-tier rows carry the
+# exponential-smoothing value as a stand-in until their fit arrives.
+def baseline_forecasts(series, min_points=MIN_POINTS):
+    matrix = right_aligned(series)
+    scores = series_scores(matrix)
+    tier = choose_tiers(scores, min_points)
+    method = np.where(tier == "SARIMA", "Exp Smoothing", tier)
+    value = np.select(
+        [method == "Mean", method == "Seasonal Naive"],
+        [mean_forecast(matrix), seasonal_naive(matrix)],
+        exp_smoothing(matrix),
+    )
+    frame = pd.DataFrame(list(series), columns=KEYS)
+    frame["Forecast"] = value
+    frame["Method"] = method
+    frame["Points"] = scores["Points"]
+    frame["Tier"] = tier
+    return frame
+
+
+# Same output as batch_forecast plus the Tier column; Method is what actually
+# produced the value (a failed SARIMA fit reports Avg) and Fit, on incremental
+# runs, is only set for the SARIMA tier.
+def tiered_forecast(df, customers=None, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, store=None,
+                    incremental=False):
+    return forecast_tiers(monthly_series(df, customers), max_workers, min_points, store, incremental)
+
+
+def forecast_tiers(series, max_workers=DEFAULT_WORKERS, min_points=MIN_POINTS, store=None, incremental=False):
+    frame = baseline_forecasts(series, min_points)
+    sarima = np.flatnonzero(frame["Tier"].to_numpy() == "SARIMA")
+    pairs = list(series)
+    chosen = {pairs[i]: series[pairs[i]] for i in sarima}
+    results, fits = stored_forecasts(chosen, store, max_workers, min_points, incremental)
+    if results:
+        frame.loc[sarima, "Forecast"] = [value for value, _ in results]
+        frame.loc[sarima, "Method"] = [method for _, method in results]
+    if fits is not None:
+        frame["Fit"] = None
+        frame.loc[sarima, "Fit"] = fits
+    return frame[COLUMNS + ["Tier"] + (["Fit"] if fits is not None else [])]